@@ -3,11 +3,23 @@
 #   a) Using dictionary `info` in `Data.py`, create a second dictionary
 #      `fromSymbol` in the same module for converting the symbol of an element
 #      to the corresponding atomic number
-from Data import info
-fromSymbol = {element['symbol']: index for index, element in enumerate(info)}
+#      The table is built from the compact element data in `Elements.py`,
+#      so that importing this module does not pull in all of `Data.py`.
+from Elements import symbols, masses, exactMasses, fromSymbol
 # print(fromSymbol)
 
 
+def __getattr__(name):
+    '''
+    Gives lazy access to `info` from `Data.py`, which used to be imported
+    here eagerly.
+    '''
+    if name == 'info':
+        from Data import info
+        return info
+    raise AttributeError("module 'Atom' has no attribute " + repr(name))
+
+
 
 #   b) Define a simple class for holding the following information of an atom
 #      as instance variables:
@@ -59,7 +71,7 @@ def symbol(self):
     Returns the symbol of the atom's element.
 
     '''
-    return info[self.element]['symbol']
+    return symbols[self.element]
 Atom.symbol = symbol
 
 #   d) For class `Atom`, define a function `mass` that returns the atom's
@@ -69,10 +81,10 @@ def mass(self):
     '''
     Returns the mass of the atom.
     '''
-    return info[self.element]['mass'] + self.hydrogens * info[1]['mass']
+    return masses[self.element] + self.hydrogens * masses[1]
 Atom.mass = mass
 def exactMass(self):
-    return info[self.element]['exactMass'] + self.hydrogens * info[1]['exactMass']
+    return exactMasses[self.element] + self.hydrogens * exactMasses[1]
 Atom.exactMass = exactMass
 #
 #   e) For class `Atom`, define a `__str__` function for pretty printing
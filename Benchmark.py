@@ -0,0 +1,396 @@
+'''
+Benchmarks for the modules in this package.
+
+Run this file as a script to measure
+
+* how long it takes to import `Atom`, `Formula` and `Molecule` in a fresh
+  interpreter, both cold (no bytecode cache is available, so every module
+  has to be compiled) and warm (modules are loaded from a bytecode cache),
+* the throughput and memory use of parsing, mass computation, formatting
+  and containment queries on the formulae of hs23_datalab_formulae.txt
+  and synthetic, scaled up versions of it. Three representations of
+  formulae are compared: a `Formula` object (dictionary) per formula, a
+  slotted object per formula, and flat columns for a whole data set.
+
+Results are written as JSON for trend tracking; a summary goes to
+standard error. Pass a previous result with `--baseline` to check for
+throughput regressions.
+
+The script exits with a non-zero status if the median import time exceeds
+the startup budget, if importing the package pulls in the full element
+table from `Data.py`, or if an operation got slower than the baseline by
+more than the tolerance.
+
+Example:
+
+    python Benchmark.py --scale 1,10 -o results.json
+    python Benchmark.py --baseline results.json
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from itertools import islice
+from operator import mul
+
+from Elements import masses
+from Formula import Formula, parseFormula, printFormula
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Startup budget in microseconds for importing `Molecule` (cumulative
+# import time of the modules of this package, not the interpreter itself).
+STARTUP_BUDGET = {'cold': 12000, 'warm': 2000}
+MODULES = ('Data', 'Elements', 'Atom', 'Formula', 'Molecule')
+DATA = os.path.join(here, 'hs23_datalab_formulae.txt')
+OPERATIONS = ('parse', 'mass', 'format', 'contains')
+
+
+def importTime(module, env, options=()):
+    '''
+    Imports `module` in a fresh interpreter (started with the given extra
+    command line options) and returns a tuple
+    (microseconds, loaded) where `microseconds` is the cumulative import
+    time of `module` and `loaded` is the set of modules of this package
+    that were imported along the way.
+    '''
+    result = subprocess.run([sys.executable, *options, '-X', 'importtime', '-c', 'import ' + module],
+                            cwd=here, env=env, capture_output=True, text=True, check=True)
+    total, loaded = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name in MODULES:
+            loaded.add(name)
+        if name == module:
+            total = int(cumulative)
+    return total, loaded
+
+
+def startupTimes(module='Molecule', repeat=15):
+    '''
+    Returns a dictionary mapping 'cold' and 'warm' to a tuple
+    (median microseconds, loaded modules) for importing `module`.
+    '''
+    times = {}
+    with tempfile.TemporaryDirectory() as empty, tempfile.TemporaryDirectory() as cache:
+        # Pointing the cache at an empty directory keeps the interpreter from
+        # reading the __pycache__ next to the modules; -B keeps it empty.
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=empty, PYTHONDONTWRITEBYTECODE='1')
+        runs = [importTime(module, env, ('-B',)) for _ in range(repeat)]
+        times['cold'] = (sorted(t for t, _ in runs)[repeat // 2], runs[0][1])
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        importTime(module, env)
+        runs = [importTime(module, env) for _ in range(repeat)]
+        times['warm'] = (sorted(t for t, _ in runs)[repeat // 2], runs[0][1])
+    return times
+
+
+class DictFormulas:
+    '''
+    A `Formula` object, wrapping a dictionary, per formula. This is the
+    representation used throughout the package.
+    '''
+    name = 'dict'
+
+    def __init__(self, lines):
+        self.formulas = [Formula(line) for line in lines]
+
+    def masses(self):
+        return [formula.mass() for formula in self.formulas]
+
+    def strings(self):
+        return [str(formula) for formula in self.formulas]
+
+    def contains(self, query):
+        return [formula.containsFormula(query) for formula in self.formulas]
+
+
+class SlottedFormula:
+    '''
+    A formula as two tuples of atomic numbers and counts, without an
+    instance dictionary.
+    '''
+    __slots__ = ('numbers', 'counts')
+
+    def __init__(self, formula):
+        self.numbers = tuple(formula)
+        self.counts = tuple(formula.values())
+
+
+class SlottedFormulas:
+    '''
+    A `SlottedFormula` object per formula.
+    '''
+    name = 'slotted'
+
+    def __init__(self, lines):
+        self.formulas = [SlottedFormula(parseFormula(line)) for line in lines]
+
+    def masses(self):
+        return [sum(map(mul, map(masses.__getitem__, formula.numbers), formula.counts))
+                for formula in self.formulas]
+
+    def strings(self):
+        return [printFormula(dict(zip(formula.numbers, formula.counts))) for formula in self.formulas]
+
+    def contains(self, query):
+        query = list(query.items())
+        result = []
+        for formula in self.formulas:
+            counts = dict(zip(formula.numbers, formula.counts))
+            result.append(all(counts.get(number, 0) >= count for number, count in query))
+        return result
+
+
+class ColumnarFormulas:
+    '''
+    All formulae in three flat arrays: the atomic numbers and counts of all
+    formulae one after the other, and the offsets of every formula into them.
+    '''
+    name = 'columnar'
+
+    def __init__(self, lines):
+        self.offsets = offsets = array('I', [0])
+        self.numbers = numbers = array('B')
+        self.counts = counts = array('I')
+        for line in lines:
+            formula = parseFormula(line)
+            numbers.extend(formula)
+            counts.extend(formula.values())
+            offsets.append(len(numbers))
+
+    def _rows(self):
+        offsets = self.offsets
+        return zip(offsets, islice(offsets, 1, None))
+
+    def masses(self):
+        products = list(map(mul, map(masses.__getitem__, self.numbers), self.counts))
+        return [sum(products[start:end]) for start, end in self._rows()]
+
+    def strings(self):
+        numbers, counts = self.numbers, self.counts
+        return [printFormula(dict(zip(numbers[start:end], counts[start:end]))) for start, end in self._rows()]
+
+    def contains(self, query):
+        numbers, counts = self.numbers, self.counts
+        query = list(query.items())
+        result = []
+        for start, end in self._rows():
+            row = dict(zip(numbers[start:end], counts[start:end]))
+            result.append(all(row.get(number, 0) >= count for number, count in query))
+        return result
+
+
+REPRESENTATIONS = (DictFormulas, SlottedFormulas, ColumnarFormulas)
+
+
+def readLines(path):
+    with open(path, 'r') as file:
+        return [line for line in map(str.strip, file) if line]
+
+
+def scaledLines(lines, factor, seed=0):
+    '''
+    Returns `factor` times as many formulae: the given ones followed by
+    `factor - 1` synthetic variants of each, with up to two carbons and
+    hydrogens added or removed, so the data set keeps its distribution of
+    elements and sizes without repeating formulae verbatim.
+    '''
+    rng = random.Random(seed)
+    result = list(lines)
+    parsed = [parseFormula(line) for line in lines] if factor > 1 else []
+    for _ in range(factor - 1):
+        for formula in parsed:
+            variant = dict(formula)
+            for number in (1, 6):
+                if number in variant:
+                    variant[number] = max(1, variant[number] + rng.randint(-2, 2))
+            result.append(printFormula(variant))
+    return result
+
+
+def bestTime(function, repeat):
+    '''
+    Calls `function` `repeat` times and returns a tuple (seconds, result)
+    of the fastest call and the result of the last call.
+    '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def benchmarkRepresentation(representation, lines, query, repeat=3):
+    '''
+    Measures a representation (one of `REPRESENTATIONS`) on a list of
+    formula strings. Returns a tuple (measurements, outputs): per operation
+    its best time, throughput and peak memory allocated on top of the data
+    (measured with tracemalloc in a separate run, as tracing slows down
+    Python considerably), the memory held by the data, and the outputs of
+    the operations for cross-checking representations.
+    '''
+    seconds, data = bestTime(lambda: representation(lines), repeat)
+    operations = {'mass': data.masses, 'format': data.strings, 'contains': lambda: data.contains(query)}
+    timings = {'parse': seconds}
+    outputs = {}
+    for name, operation in operations.items():
+        timings[name], outputs[name] = bestTime(operation, repeat)
+    del data
+
+    tracemalloc.start()
+    try:
+        data = representation(lines)
+        held, peaks = tracemalloc.get_traced_memory()
+        peaks = {'parse': peaks}
+        operations = {'mass': data.masses, 'format': data.strings, 'contains': lambda: data.contains(query)}
+        for name, operation in operations.items():
+            tracemalloc.reset_peak()
+            operation()
+            peaks[name] = tracemalloc.get_traced_memory()[1] - held
+    finally:
+        tracemalloc.stop()
+
+    measurements = {'memory': {'bytes': held, 'bytesPerFormula': held / len(lines) if lines else 0}}
+    for name in OPERATIONS:
+        measurements[name] = {'seconds': timings[name],
+                              'perSecond': len(lines) / timings[name] if timings[name] else None,
+                              'peakBytes': peaks[name]}
+    return measurements, outputs
+
+
+def benchmarkDataset(lines, query, repeat=3):
+    '''
+    Benchmarks all representations on a list of formula strings and checks
+    that they agree. Returns a dictionary mapping representation names to
+    measurements (see `benchmarkRepresentation`).
+    '''
+    query = parseFormula(query)
+    results, reference = {}, None
+    for representation in REPRESENTATIONS:
+        results[representation.name], outputs = benchmarkRepresentation(representation, lines, query, repeat)
+        if reference is None:
+            reference = outputs
+        elif (outputs['format'] != reference['format'] or outputs['contains'] != reference['contains']
+              or any(abs(a - b) > 1e-6 for a, b in zip(outputs['mass'], reference['mass']))):
+            raise ValueError('Representation %r disagrees with %r' % (representation.name, REPRESENTATIONS[0].name))
+    return results
+
+
+def maxRss():
+    '''
+    Returns the peak resident set size of this process in KiB, or None
+    where the `resource` module is unavailable.
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def regressions(results, baseline, tolerance):
+    '''
+    Compares the throughput of `results` to a previous `baseline` result
+    and returns messages for every operation that got slower by more than
+    `tolerance` (a fraction).
+    '''
+    messages = []
+    previous = {dataset['name']: dataset for dataset in baseline.get('datasets', [])}
+    for dataset in results['datasets']:
+        old = previous.get(dataset['name'])
+        if old is None:
+            continue
+        for name, measurements in dataset['representations'].items():
+            for operation in OPERATIONS:
+                before = old['representations'].get(name, {}).get(operation, {}).get('perSecond')
+                after = measurements[operation]['perSecond']
+                if before and after and after < before * (1 - tolerance):
+                    messages.append('%s %s %s: %.0f/s, was %.0f/s (%+.0f%%)'
+                                    % (dataset['name'], name, operation, after, before,
+                                       100 * (after / before - 1)))
+    return messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark import time, throughput and memory use.')
+    parser.add_argument('--data', default=DATA, help='file with one formula per line (default: %(default)s)')
+    parser.add_argument('--scale', default='1',
+                        help='comma separated scale factors of synthetic data sets (default: 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (default: 3)')
+    parser.add_argument('--query', default='C6H6O', help='formula for containment queries (default: C6H6O)')
+    parser.add_argument('--no-startup', action='store_true', help='skip the import time measurements')
+    parser.add_argument('--baseline', help='previous JSON result to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed throughput loss against the baseline (default: 0.2)')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: standard output)')
+    args = parser.parse_args(argv)
+    try:
+        scales = [int(scale) for scale in args.scale.split(',') if scale.strip()]
+        if any(scale < 1 for scale in scales) or args.repeat < 1:
+            raise ValueError('Scale factors and --repeat must be positive')
+    except ValueError as error:
+        parser.error(str(error))
+
+    failed = False
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'startup': {}, 'datasets': []}
+    if not args.no_startup:
+        for mode, (micros, loaded) in startupTimes().items():
+            budget = STARTUP_BUDGET[mode]
+            status = 'ok' if micros <= budget else 'OVER BUDGET'
+            print('import Molecule (%s): %6d us  budget %6d us  %s' % (mode, micros, budget, status), file=sys.stderr)
+            failed = failed or micros > budget
+            if 'Data' in loaded:
+                print('import Molecule (%s): Data.py was imported' % mode, file=sys.stderr)
+                failed = True
+            results['startup'][mode] = {'micros': micros, 'budget': budget, 'dataImported': 'Data' in loaded}
+
+    lines = readLines(args.data)
+    name = os.path.splitext(os.path.basename(args.data))[0]
+    for scale in scales:
+        data = scaledLines(lines, scale)
+        representations = benchmarkDataset(data, args.query, args.repeat)
+        results['datasets'].append({'name': '%s x%d' % (name, scale), 'formulas': len(data),
+                                    'representations': representations})
+        for representation, measurements in representations.items():
+            print('%s x%d %-8s %s  %.0f bytes/formula' % (
+                name, scale, representation,
+                '  '.join('%s %8.0f/s' % (operation, measurements[operation]['perSecond'] or 0)
+                          for operation in OPERATIONS),
+                measurements['memory']['bytesPerFormula']), file=sys.stderr)
+    results['maxRssKiB'] = maxRss()
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            messages = regressions(results, json.load(file), args.tolerance)
+        for message in messages:
+            print('regression: ' + message, file=sys.stderr)
+        failed = failed or bool(messages)
+
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+            file.write('\n')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
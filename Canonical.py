@@ -0,0 +1,175 @@
+'''
+Canonical labeling of molecules, for deduplication of compounds whose
+atoms are numbered differently.
+
+The functions here are used through `Molecule.canonicalOrder`,
+`Molecule.canonicalString` and `Molecule.canonicalHash`, which cache
+their result, and are only imported when first needed.
+
+Example:
+
+    for molecule in uniqueMolecules(molecules):
+        print(molecule.canonicalString())
+'''
+
+
+def canonicalize(molecule):
+    '''
+    Returns a tuple (order, string, hash) of the atom indices of the
+    molecule in canonical order, its canonical string and a stable 64 bit
+    hash of the string.
+    '''
+    # Morgan-style refinement: atoms start with ranks derived from their
+    # labels (element, hydrogens, charge, degree). Each round re-ranks
+    # atoms by their own rank plus the sorted ranks and bond orders of
+    # their neighbors, until the number of classes stops growing. Ties
+    # left over are not necessarily symmetric atoms, so each atom of the
+    # first tied class is given a rank of its own in turn, refining
+    # again and searching recursively; the ordering with the smallest
+    # string wins. Automorphisms found along the way prune the search
+    # (see `_canonicalComponent`). Components are labeled on their own
+    # and ordered by their strings, so mixtures of identical components
+    # do not multiply the search.
+    mol = molecule.mol
+    invariants = {node: (atom.element, atom.hydrogens, atom.charge, len(neighbors))
+                  for node, (atom, neighbors) in mol.items()}
+    ranks = _rank(invariants)
+    parts = sorted(_canonicalComponent(mol, {node: ranks[node] for node in component})
+                   for component in molecule.components())
+    order = [node for _, nodes in parts for node in nodes]
+    string = orderString(mol, order)
+    # hashlib is imported here since it takes longer to import than the
+    # rest of the package.
+    import hashlib
+    digest = hashlib.blake2b(string.encode('utf-8'), digest_size=8).digest()
+    return order, string, int.from_bytes(digest, 'big')
+
+
+def _canonicalComponent(mol, ranks):
+    # Returns (string, order) of the smallest ordering of a component.
+    # Two leaves of the search with equal strings give an automorphism,
+    # which prunes the search in two ways, as in nauty:
+    # * The subtree of the later leaf, below the node where its path
+    #   leaves that of the earlier one, is the image of a subtree already
+    #   searched, so the search backs up to that node.
+    # * At every node, the atoms to individualize are grouped into orbits
+    #   (kept in a union-find) of the automorphisms fixing the atoms
+    #   individualized so far, and only one atom per orbit is searched.
+    #   These automorphisms preserve the refined ranks, so they map the
+    #   class onto itself.
+    # Leaves are compared with the first leaf and the best one so far.
+    # Automorphisms are stored as dictionaries of the atoms they move.
+    leaves = {}
+    automorphisms = []
+
+    def search(ranks, path):
+        # Returns the depth of the node at which the search goes on.
+        ranks = _refine(mol, ranks)
+        cells = {}
+        for node, rank in ranks.items():
+            cells.setdefault(rank, []).append(node)
+        tied = [rank for rank, members in cells.items() if len(members) > 1]
+        if not tied:
+            order = sorted(ranks, key=ranks.__getitem__)
+            string = orderString(mol, order)
+            if not leaves:
+                leaves['first'] = leaves['best'] = (string, order, path)
+                return len(path)
+            for other, otherOrder, otherPath in (leaves['first'], leaves['best']):
+                if string == other:
+                    automorphisms.append({node: image for node, image in zip(order, otherOrder)
+                                          if node != image})
+                    depth = 0
+                    while path[depth] == otherPath[depth]:
+                        depth += 1
+                    return depth
+            if string < leaves['best'][0]:
+                leaves['best'] = (string, order, path)
+            return len(path)
+        cell = min(tied)
+        members = sorted(cells[cell])
+        orbits = {}
+        merged = 0
+        searched = []
+        for chosen in members:
+            for automorphism in automorphisms[merged:]:
+                if not any(node in automorphism for node in path):
+                    for node in members:
+                        if node in automorphism:
+                            _union(orbits, node, automorphism[node])
+            merged = len(automorphisms)
+            orbit = _find(orbits, chosen)
+            if any(_find(orbits, node) == orbit for node in searched):
+                continue
+            searched.append(chosen)
+            depth = search({node: 2 * rank + (rank == cell and node != chosen) for node, rank in ranks.items()},
+                           path + [chosen])
+            if depth < len(path):
+                return depth
+        return len(path)
+
+    search(ranks, [])
+    string, order, _ = leaves['best']
+    return string, order
+
+
+def _find(parents, node):
+    # Union-find over a dictionary; nodes not in it are their own roots.
+    root = node
+    while parents.get(root, root) != root:
+        root = parents[root]
+    while node != root:
+        parents[node], node = root, parents.get(node, node)
+    return root
+
+
+def _union(parents, a, b):
+    a, b = _find(parents, a), _find(parents, b)
+    if a != b:
+        parents[max(a, b)] = min(a, b)
+
+
+def _refine(mol, ranks):
+    classes = len(set(ranks.values()))
+    while True:
+        invariants = {node: (rank, tuple(sorted((ranks[neighbor], bond)
+                                                for neighbor, bond in mol[node][1].items())))
+                      for node, rank in ranks.items()}
+        refined = _rank(invariants)
+        count = len(set(refined.values()))
+        if count == classes:
+            return refined
+        ranks, classes = refined, count
+
+
+def orderString(mol, order):
+    '''
+    Returns the string of the atoms of `mol` (the `mol` dictionary of a
+    molecule) in the given order followed by the sorted bonds between
+    their positions.
+    '''
+    position = {node: index for index, node in enumerate(order)}
+    bonds = sorted((min(position[node], position[neighbor]), max(position[node], position[neighbor]), bond)
+                   for node in order for neighbor, bond in mol[node][1].items() if node < neighbor)
+    return '.'.join(str(mol[node][0]) for node in order) + '|' + ','.join(
+        '%d-%d:%d' % bond for bond in bonds)
+
+
+def _rank(invariants):
+    # Dense ranks 0, 1, 2, ... of the given (sortable) invariants.
+    rank = {value: index for index, value in enumerate(sorted(set(invariants.values())))}
+    return {node: rank[value] for node, value in invariants.items()}
+
+
+def uniqueMolecules(molecules):
+    '''
+    Generator yielding the molecules of an iterable, skipping every
+    molecule that is the same compound as one yielded before (as decided
+    by the canonical string).
+    '''
+    seen = set()
+    for molecule in molecules:
+        key = molecule.canonicalString()
+        if key not in seen:
+            seen.add(key)
+            yield molecule
@@ -0,0 +1,119 @@
+'''
+Topological distances of molecules: the number of bonds on a shortest path
+between two atoms, and descriptors derived from them.
+
+The distance matrix of a molecule is computed once by `computeDistances`
+and cached by `Molecule`; the functions here are used through the
+distance methods of `Molecule` (`eccentricity`, `diameter`, `radius`,
+`wienerIndex`) and are only imported when first needed.
+
+Distances between atoms of different components are None. The diameter
+and radius of a disconnected molecule (e.g. a salt such as tyrosine
+hydrochloride) are those of its largest component, i.e. the one with the
+most atoms, or the first of those with the most atoms.
+
+Example:
+
+    print(topologicalDescriptors(molecules, workers=4))
+'''
+
+
+def computeDistances(molecule):
+    '''
+    Returns the distances between all pairs of atoms of the molecule as a
+    list of lists, computed by a breadth first search from every atom.
+    '''
+    count = len(molecule.mol)
+    neighbors = [list(molecule.mol[node][1]) for node in range(count)]
+    matrix = []
+    for source in range(count):
+        row = [None] * count
+        row[source] = 0
+        frontier = [source]
+        distance = 0
+        while frontier:
+            distance += 1
+            reached = []
+            for node in frontier:
+                for neighbor in neighbors[node]:
+                    if row[neighbor] is None:
+                        row[neighbor] = distance
+                        reached.append(neighbor)
+            frontier = reached
+        matrix.append(row)
+    return matrix
+
+
+def eccentricity(molecule, node):
+    '''
+    Returns the largest distance between the given atom and any atom of
+    its component.
+    '''
+    return max(distance for distance in molecule._distanceMatrix()[node] if distance is not None)
+
+
+def diameter(molecule):
+    '''
+    Returns the largest eccentricity of the atoms of the largest
+    component, or 0 for an empty molecule.
+    '''
+    return max((eccentricity(molecule, node) for node in _largestComponent(molecule)), default=0)
+
+
+def radius(molecule):
+    '''
+    Returns the smallest eccentricity of the atoms of the largest
+    component, or 0 for an empty molecule.
+    '''
+    return min((eccentricity(molecule, node) for node in _largestComponent(molecule)), default=0)
+
+
+def _largestComponent(molecule):
+    return max(molecule.components(), key=len, default=[])
+
+
+def wienerIndex(molecule):
+    '''
+    Returns the Wiener index, the sum of the distances between all pairs
+    of connected atoms.
+    '''
+    return sum(sum(distance for distance in row if distance is not None)
+               for row in molecule._distanceMatrix()) // 2
+
+
+def shortestPath(molecule, node1, node2):
+    '''
+    Returns a list of node indices of a shortest path between node1 and
+    node2, or the empty list if they are not connected. Uses the cached
+    distance matrix of the molecule.
+    '''
+    distances = molecule._distanceMatrix()
+    if distances[node1][node2] is None:
+        return []
+    path = [node1]
+    while path[-1] != node2:
+        # Step to a neighbor one bond closer to node2.
+        remaining = distances[path[-1]][node2] - 1
+        path.append(next(neighbor for neighbor in molecule.mol[path[-1]][1]
+                         if distances[neighbor][node2] == remaining))
+    return path
+
+
+def _descriptors(molecule):
+    return {'wiener': wienerIndex(molecule), 'diameter': diameter(molecule), 'radius': radius(molecule)}
+
+
+def topologicalDescriptors(molecules, workers=1, chunkSize=64):
+    '''
+    Computes the Wiener index, diameter and radius of every molecule of an
+    iterable and returns them as a list of dictionaries with the keys
+    'wiener', 'diameter' and 'radius'. The diameter and radius of a
+    disconnected molecule are those of its largest component. If
+    `workers` is greater than one, the molecules are distributed over that
+    many worker processes in chunks of `chunkSize` molecules.
+    '''
+    if workers <= 1:
+        return [_descriptors(molecule) for molecule in molecules]
+    from multiprocessing import Pool
+    with Pool(workers) as pool:
+        return pool.map(_descriptors, molecules, chunkSize)
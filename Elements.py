@@ -0,0 +1,88 @@
+# This module provides compact element tables (symbols, masses and
+# exact masses) for `Atom`, `Formula` and `Molecule`.
+#
+# The full table in `Data.py` is a large literal, which Python has to
+# compile every time the program starts without a bytecode cache (read-only
+# deployments, short-lived workers, ...). The few columns we actually need
+# at runtime are therefore also stored in a small binary file `Elements.dat`
+# next to this module. The file is regenerated from `Data.py` by running
+#
+#   python Elements.py
+#
+# `Data.py` is only imported if the binary file is missing or unreadable.
+#
+# Layout of `Elements.dat` (all numbers little endian):
+#
+#   4 bytes    magic `ELEM`
+#   4 bytes    number of elements `n` (unsigned int)
+#   8n bytes   masses (double)
+#   8n bytes   exact masses (double)
+#   rest       element symbols (ASCII), separated by single spaces
+
+import os
+import sys
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Elements.dat')
+MAGIC = b'ELEM'
+
+
+def readTables(path=path):
+    '''
+    Reads the element tables from the binary file at `path`.
+    Returns a tuple (symbols, masses, exactMasses) of lists indexed
+    by atomic number.
+    Raises OSError if the file cannot be read and ValueError if it is corrupt.
+    '''
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:4] != MAGIC:
+        raise ValueError('Not an element table: ' + path)
+    n = int.from_bytes(data[4:8], 'little')
+    if sys.byteorder == 'little':
+        columns = memoryview(data)[8:8 + 16 * n].cast('d').tolist()
+    else:
+        import struct
+        columns = list(struct.unpack_from('<%dd' % (2 * n), data, 8))
+    symbols = data[8 + 16 * n:].decode('ascii').split(' ')
+    if len(symbols) != n:
+        raise ValueError('Corrupt element table: ' + path)
+    return symbols, columns[:n], columns[n:]
+
+
+def dataTables():
+    '''
+    Builds the element tables from the full table in `Data.py`.
+    Returns a tuple (symbols, masses, exactMasses) of lists indexed
+    by atomic number.
+    '''
+    from Data import info
+    return ([element['symbol'] for element in info],
+            [float(element['mass']) for element in info],
+            [float(element['exactMass']) for element in info])
+
+
+def writeTables(path=path):
+    '''
+    Writes the element tables from `Data.py` to the binary file at `path`
+    and returns the number of elements written.
+    '''
+    import struct
+    symbols, masses, exactMasses = dataTables()
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(symbols).to_bytes(4, 'little'))
+        file.write(struct.pack('<%dd' % (2 * len(symbols)), *masses, *exactMasses))
+        file.write(' '.join(symbols).encode('ascii'))
+    return len(symbols)
+
+
+try:
+    symbols, masses, exactMasses = readTables()
+except (OSError, ValueError):
+    symbols, masses, exactMasses = dataTables()
+
+fromSymbol = {symbol: number for number, symbol in enumerate(symbols)}
+
+
+if __name__ == '__main__':
+    print('Wrote', writeTables(), 'elements to', path)
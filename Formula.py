@@ -16,8 +16,18 @@
 #
 # Let's get started.
 
-from Data import info
-from Atom import fromSymbol
+from Elements import symbols, masses, exactMasses, fromSymbol
+
+
+def __getattr__(name):
+    '''
+    Gives lazy access to `info` from `Data.py`, which used to be imported
+    here eagerly.
+    '''
+    if name == 'info':
+        from Data import info
+        return info
+    raise AttributeError("module 'Formula' has no attribute " + repr(name))
 
 # a) Implement a function `symbol`, which returns the element
 #    symbol of its argument: If the argument is an `int`, it should
@@ -30,7 +40,7 @@ def symbol(element):
     If the input is an atomic number it is converted to the element and returned. 
     If the input is an element it is returned.
     '''
-    return info[element]['symbol'] if isinstance(element, int) else fromSymbol[element]
+    return symbols[element] if isinstance(element, int) else element
 
 #
 # b) Implement a function `atomicNumber`, which returns the atomic
@@ -130,16 +140,17 @@ def element(pos, string):
     '''
     This function takes a position and a string as arguments.
     The position is the position of the first character of an element in the string.
-    The function returns the position of the first character of the next element
+    The function returns the position of the first character after the element
     and the atomic number of the element.
-    If the element is not found the function returns the position and 0.
+    If there is no known element symbol at the position the function returns the position and 0.
     '''
-    if pos < len(string)-1 and string[pos+1].islower():
-        return pos+2, atomicNumber(string[pos:pos+2])
-    elif string[pos].isupper():
-        return pos+1, atomicNumber(string[pos])
-    else:
-        return pos, 0
+    if pos < len(string) and string[pos].isupper():
+        if pos + 1 < len(string) and string[pos+1].islower():
+            number = fromSymbol.get(string[pos:pos+2], 0)
+            return (pos+2, number) if number else (pos, 0)
+        number = fromSymbol.get(string[pos], 0)
+        return (pos+1, number) if number else (pos, 0)
+    return pos, 0
 
 
 def counter(pos, string):
@@ -148,39 +159,213 @@ def counter(pos, string):
     The position is the position of the first character of a number in the string.
     The function returns the position of the first character after the number
     and the count of the element.
-    If the number is not found the function returns the position and 1. 
-    Hence an element in the input can NOT be followed by a number 0.
-    For example C0 is not a good input since the parser will count the C as 1.
+    If the number is not found the function returns the position and 1.
+    A count of 0 (e.g. in C0) is returned as 0.
     '''
-    count = 0
-    i = 0
-    while pos + i < len(string)-1:
-        # if string[pos + i].isalpha() and string[pos+i+1].isalpha():
-        #     return pos + i, 1
-        if string[pos + i].isdigit():
-            count = count * 10 + int(string[pos + i])
-            i += 1
-        else:
-            break
-    return pos + i, max(1, count)
+    start = pos
+    while pos < len(string) and '0' <= string[pos] <= '9':
+        pos += 1
+    return (pos, int(string[start:pos])) if pos > start else (pos, 1)
 
 
-    
-def parseFormula(string):
+class FormulaError(ValueError):
     '''
-    This function takes a string as an argument and returns a dictionary
-    mapping atomic numbers to counts.
-    The string must be a valid molecular formula. Element symbols should not be followed by 0.
+    This exception is raised for molecular formulae that cannot be parsed.
+
+    Attributes:
+    string (str): The formula.
+    position (int): The position of the offending character in the formula.
+    reason (str): A short description of the problem.
+    line (int): The line number of the formula in bulk parsing, or None.
     '''
+    def __init__(self, string, position, reason, line=None):
+        message = '%s at position %d in %r' % (reason, position, string)
+        ValueError.__init__(self, message if line is None else 'line %d: %s' % (line, message))
+        self.string = string
+        self.position = position
+        self.reason = reason
+        self.line = line
+
+    def __reduce__(self):
+        # Keeps the exception picklable, e.g. when raised in worker processes.
+        return FormulaError, (self.string, self.position, self.reason, self.line)
+
+
+SEPARATORS = '·•.*'
+GROUPS = {'(': ')', '[': ']'}
+
+_simpleFormula = _pairs = _charge = None
+
+
+def _compilePatterns():
+    # `re` is only imported once a formula is parsed, since importing it
+    # would double the startup time of this module.
+    global _simpleFormula, _pairs, _charge
+    import re
+    _simpleFormula = re.compile(r'(?:[A-Z][a-z]?[0-9]*)+').fullmatch
+    _pairs = re.compile(r'([A-Z][a-z]?)([0-9]*)').findall
+    _charge = re.compile(r'\^?(?:([0-9]+)([+-])|([+-])([0-9]+)|(\++|-+))').match
+
+
+def parseIon(string, strict=True):
+    '''
+    This function takes a string as an argument and returns a tuple
+    (formula, charge), where formula is a dictionary mapping atomic numbers
+    to counts and charge is an integer. See `parseFormula` for the syntax.
+    '''
+    # Fast path for plain formulae like "C2H6O", which make up almost all
+    # real data.
+    if _simpleFormula is None:
+        _compilePatterns()
+    if _simpleFormula(string):
+        formula = {}
+        for sym, digits in _pairs(string):
+            number = fromSymbol.get(sym)
+            if not number:
+                break
+            formula[number] = formula.get(number, 0) + (int(digits) if digits else 1)
+        else:
+            if 0 in formula.values():
+                formula = {number: count for number, count in formula.items() if count}
+            return formula, 0
+    return _parseIon(string, strict)
+
+
+def _parseIon(string, strict):
+    if not string and strict:
+        raise FormulaError(string, 0, 'Empty formula')
     formula = {}
+    charge = 0
+    length = len(string)
     pos = 0
-    while pos < len(string):
-        pos, elem = element(pos, string)
-        if elem == 0:
+    while length:
+        # A part of a hydrate: an optional multiplier, elements and groups,
+        # and an optional charge.
+        start = pos
+        pos, multiplier = counter(pos, string)
+        part = {}
+        stack = []
+        symbols = 0
+        while pos < length and string[pos] not in SEPARATORS:
+            char = string[pos]
+            if char in GROUPS:
+                stack.append((part, pos))
+                part = {}
+                pos += 1
+            elif char in ')]':
+                if not stack or GROUPS[string[stack[-1][1]]] != char:
+                    if strict:
+                        raise FormulaError(string, pos, 'Unmatched %r' % char)
+                    pos += 1
+                    continue
+                if not part and strict:
+                    raise FormulaError(string, pos, 'Empty group')
+                outer, _ = stack.pop()
+                pos, count = counter(pos+1, string)
+                for number, atoms in part.items():
+                    outer[number] = outer.get(number, 0) + atoms * count
+                part = outer
+            elif char in '+-^':
+                match = _charge(string, pos)
+                end = match.end() if match else pos + 1
+                if match is None or (end < length and string[end] not in SEPARATORS):
+                    if strict:
+                        raise FormulaError(string, pos, 'Invalid charge')
+                    pos = end
+                    continue
+                digits, sign, sign2, digits2, signs = match.groups()
+                if strict and signs and len(signs) == 1 and char != '^' and symbols == 1 and string[pos-1].isdigit():
+                    # A single element with a count and a bare sign, like
+                    # Fe2+ or O2-, is usually meant as ion notation.
+                    count = pos - 1
+                    while string[count-1].isdigit():
+                        count -= 1
+                    raise FormulaError(string, pos, 'Ambiguous charge, write %s^%s%s or %s^%s' % (
+                        string[:count], string[count:pos], signs, string[:pos], signs))
+                if signs:
+                    charge += multiplier * (len(signs) if signs[0] == '+' else -len(signs))
+                else:
+                    magnitude = int(digits or digits2)
+                    charge += multiplier * (magnitude if (sign or sign2) == '+' else -magnitude)
+                pos = end
+            else:
+                end, number = element(pos, string)
+                if number:
+                    pos, count = counter(end, string)
+                    part[number] = part.get(number, 0) + count
+                    symbols += 1
+                elif strict:
+                    if char.isupper():
+                        sym = string[pos:pos+2] if string[pos+1:pos+2].islower() else char
+                        raise FormulaError(string, pos, 'Unknown element %r' % sym)
+                    raise FormulaError(string, pos, 'Unexpected character %r' % char)
+                else:
+                    # Skips the unknown symbol together with its count.
+                    pos = counter(pos + 1 + string[pos+1:pos+2].islower(), string)[0] if char.isupper() else pos + 1
+        if stack:
+            if strict:
+                raise FormulaError(string, stack[-1][1], 'Unclosed %r' % string[stack[-1][1]])
+            while stack:
+                outer, _ = stack.pop()
+                for number, atoms in part.items():
+                    outer[number] = outer.get(number, 0) + atoms
+                part = outer
+        if not symbols and strict:
+            raise FormulaError(string, start, 'Missing element')
+        for number, atoms in part.items():
+            formula[number] = formula.get(number, 0) + atoms * multiplier
+        if pos >= length:
             break
-        pos, count = counter(pos, string)
-        addElement(formula, elem, count)
-    return formula
+        pos += 1
+    return {number: count for number, count in formula.items() if count}, charge
+
+
+def parseFormula(string, strict=True):
+    '''
+    This function takes a string as an argument and returns a dictionary
+    mapping atomic numbers to counts. Element counts may be 0 (e.g. C0).
+    Besides plain formulae like "CH3CH2OH", the parser understands
+    parenthesized groups ("Ca(OH)2", "[Cu(NH3)4]SO4"), hydrates with an
+    optional multiplier ("CuSO4·5H2O", "CuSO4.5H2O", "CuSO4*5H2O") and a
+    trailing charge ("NH4+", "SO4-2", "Fe^3+"), which is ignored here; use
+    `parseIon` to get it.
+    Digits right before a sign always count the preceding element or
+    group, so "NH4+" is NH4 with charge +1. The magnitude of a charge goes
+    after the sign ("Fe+3", "SO4-2") or after a caret ("Fe^3+", "SO4^2-").
+    Ion notation like "Fe3+" would thus read as Fe3 with charge +1, so for
+    a single element with a count and a bare sign strict mode raises a
+    FormulaError instead; write "Fe^3+" for the ion, or "Fe3^+". Lenient
+    mode reads it as a count.
+    In strict mode, malformed formulae raise a FormulaError with the
+    position and reason of the problem, and so does the empty string. In
+    lenient mode, unknown symbols and unexpected characters are skipped,
+    unclosed groups are closed at the end and the empty string gives an
+    empty formula.
+    '''
+    return parseIon(string, strict)[0]
+
+
+def parseFormulas(lines, strict=True, errors=None):
+    '''
+    This generator takes an iterable of lines (e.g. an open file) with one
+    formula per line and yields tuples (lineNumber, formula), with line
+    numbers starting at 1. Blank lines are skipped.
+    If `errors` is a list, lines that cannot be parsed are appended to it
+    as tuples (lineNumber, reason) and parsing goes on; otherwise a
+    FormulaError carrying the line number is raised.
+    '''
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            formula = parseIon(line, strict)[0]
+        except FormulaError as error:
+            if errors is None:
+                raise FormulaError(error.string, error.position, error.reason, number) from None
+            errors.append((number, '%s at position %d' % (error.reason, error.position)))
+            continue
+        yield number, formula
 
 
 # g) Implement a function `numAtoms(formula,element)` for extracting the number of atoms
@@ -234,13 +419,17 @@ def printPair(element, count):
 #    molecular formulae in Hill order. Make sure to correctly sort
 #    everything before assembling the string, and use `printPair`
 #    in your implementation.
-def printFormula(formula):
+def printFormula(formula, charge=0):
     '''
-    This function takes a formula as an argument.
+    This function takes a formula and optionally a charge as arguments.
     The formula must be a dictionary mapping atomic numbers to counts.
-    The function returns a string representing the formula in Hill order.
+    The function returns a string representing the formula in Hill order,
+    followed by the charge if it is not 0 (e.g. "SO4-2"). A charge of +1 or
+    -1 on a single element with a count is written with a caret ("Fe2^+"),
+    since "Fe2+" is ambiguous (see `parseFormula`).
     '''
     formula = {symbol(number): count for number, count in formula.items()}
+    caret = '^' if charge in (-1, 1) and len(formula) == 1 and max(formula.values()) > 1 else ''
     result = ''
     if 'C' in formula:
         result += printPair('C', formula['C'])
@@ -250,7 +439,17 @@ def printFormula(formula):
         del formula['H']
     for element in sorted(formula.keys()):
         result += printPair(element, formula[element])
-    return result
+    return result + caret + printCharge(charge)
+
+
+def printCharge(charge):
+    '''
+    This function takes a charge and returns it as a string that `parseIon`
+    understands: '' for 0, '+' and '-' for 1 and -1, else e.g. '+2' or '-3'.
+    '''
+    if charge in (-1, 0, 1):
+        return ('', '+', '-')[charge]
+    return '%+d' % charge
 
 
 #
@@ -273,6 +472,7 @@ class Formula:
 
     Attributes:
     __formula: A dictionary representing the molecular formula.
+    charge: The charge of the formula (0 unless given, e.g. "NH4+").
 
     Methods:
     __init__(formula): Initializes the Formula object with a formula.
@@ -292,55 +492,81 @@ class Formula:
     addFormula(other): Adds another formula to the formula.
     get_formula(): Returns the formula dictionary.
     '''
-    def __init__(self, formula):
-        self.__formula = parseFormula(formula) if isinstance(formula, str) else formula
+    def __init__(self, formula, charge=0):
+        if isinstance(formula, str):
+            formula, parsed = parseIon(formula)
+            charge += parsed
+        self.__formula = formula
+        self.charge = charge
     def __str__(self):
-        return printFormula(self.__formula)
+        return printFormula(self.__formula, self.charge)
     def __repr__(self):
-        return str(self.__formula)
+        return str(self.__formula) + (' %+d' % self.charge if self.charge else '')
     def __getitem__(self, element):
         return self.__formula[atomicNumber(element)] if atomicNumber(element) in self.__formula else 0
     def __contains__(self, element):
         return atomicNumber(element) in self.__formula
     def __add__(self, other):
+        charge = self.charge
         if isinstance(other, Formula):
+            charge += other.charge
             other = other.__formula
         result = self.__formula.copy()
         for element, count in other.items():
             addElement(result, element, count)
-        return Formula(result)
+        return Formula(result, charge)
     def __sub__(self, other):
+        charge = self.charge
         if isinstance(other, Formula):
+            charge -= other.charge
             other = other.__formula
         result = self.__formula.copy()
         for element, count in other.items():
-            addElement(result, element, -count)
-        return Formula(result)
+            element = atomicNumber(element)
+            remaining = result.get(element, 0) - count
+            if remaining < 0:
+                raise ValueError('Cannot subtract %d %s from %s' % (count, symbol(element), self))
+            if remaining:
+                result[element] = remaining
+            else:
+                result.pop(element, None)
+        return Formula(result, charge)
     def __eq__(self, other):
+        charge = 0
         if isinstance(other, Formula):
+            charge = other.charge
             other = other.__formula
-        return self.__formula == other
+        return self.__formula == other and self.charge == charge
     def __ne__(self, other):
-        if isinstance(other, Formula):
-            other = other.__formula
-        return self.__formula != other
+        return not self == other
     def mass(self):
-        return sum([info[number]['mass'] * count for number, count in self.__formula.items()])
+        return sum([masses[number] * count for number, count in self.__formula.items()])
     def exactMass(self):
-        return sum([info[number]['exactMass'] * count for number, count in self.__formula.items()])
+        return sum([exactMasses[number] * count for number, count in self.__formula.items()])
     def numAtoms(self, element):
         return self.__formula[atomicNumber(element)] if atomicNumber(element) in self.__formula else 0
     def hasElement(self, element):
         return atomicNumber(element) in self.__formula
     def containsFormula(self, other):
-        other = parseFormula(other)
+        if isinstance(other, Formula):
+            other = other.__formula
+        elif isinstance(other, str):
+            other = parseFormula(other)
+        elif isinstance(other, list):
+            other = formulaFromList(other)
         for element, count in other.items():
             if element not in self.__formula or self.__formula[element] < count:
                 return False
         return True
     def addFormula(self, other):
-        if isinstance(other, str):
-            other = parseFormula(other)
+        if isinstance(other, Formula):
+            self.charge += other.charge
+            other = other.__formula
+        elif isinstance(other, str):
+            other, charge = parseIon(other)
+            self.charge += charge
+        elif isinstance(other, list):
+            other = formulaFromList(other)
         for element, count in other.items():
             addElement(self.__formula, element, count)
         return self
@@ -0,0 +1,371 @@
+'''
+Asynchronous formula service.
+
+Serves formula parsing, mass lookup and containment screening over plain
+TCP. Clients send one JSON object per line and receive one JSON object per
+line in return:
+
+    {"id": 1, "op": "parse", "formula": "CH3CH2OH"}
+    -> {"id": 1, "result": {"hill": "C2H6O", "counts": {"C": 2, "H": 6, "O": 1}}}
+
+    {"id": 2, "op": "mass", "formula": "C2H6O"}
+    -> {"id": 2, "result": {"mass": 46.069, "exactMass": 46.041864812}}
+
+    {"id": 3, "op": "contains", "formula": "C2H6O", "query": "CO"}
+    -> {"id": 3, "result": true}
+
+The query of 'contains' is a formula string or an object of element
+counts keyed by symbol or atomic number, e.g. {"C": 1, "8": 1}.
+
+    {"id": 4, "op": "stats"}
+    -> {"id": 4, "result": {"requests": 3, "batches": 1, "p50": ..., ...}}
+
+Responses carry the `id` of their request and may arrive out of order.
+Failed requests are answered with {"id": ..., "error": "..."}.
+
+Concurrent requests (from one or many connections) are coalesced into
+micro-batches of at most `maxBatch` requests, waiting at most `maxDelay`
+seconds for a batch to fill up. Batches are processed by `processBatch`
+on a pool of worker processes, which parses every distinct formula of a
+batch only once.
+
+Run the service with
+
+    python FormulaService.py --port 8765 --workers 4
+'''
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from Elements import symbols
+from Formula import Formula, atomicNumber, parseFormula, printFormula, symbol
+
+OPERATIONS = ('parse', 'mass', 'contains')
+
+
+def processBatch(requests):
+    '''
+    Processes a list of requests (dictionaries with keys 'op', 'formula'
+    and, for 'contains', 'query') and returns a list of results in the same
+    order. A result is a tuple (True, value) on success and (False, message)
+    on failure, e.g. for a formula that is not a string.
+    '''
+    formulas = {}
+    results = []
+    for request in requests:
+        try:
+            op = request['op']
+            if op not in OPERATIONS:
+                raise ValueError('Unknown operation: ' + str(op))
+            string = request.get('formula')
+            if not isinstance(string, str):
+                raise ValueError('Formula must be a string')
+            formula = formulas.get(string)
+            if formula is None:
+                formula = formulas[string] = Formula(parseFormula(string))
+            if op == 'parse':
+                counts = formula.get_formula()
+                value = {'hill': printFormula(counts),
+                         'counts': {symbol(number): count for number, count in counts.items()}}
+            elif op == 'mass':
+                value = {'mass': formula.mass(), 'exactMass': formula.exactMass()}
+            else:
+                value = formula.containsFormula(queryFormula(request['query']))
+            results.append((True, value))
+        except Exception as error:
+            results.append((False, '%s: %s' % (type(error).__name__, error)))
+    return results
+
+
+def queryFormula(query):
+    '''
+    Converts the query of a 'contains' request, either a formula string or
+    an object mapping element symbols or atomic numbers (as strings) to
+    counts, to a dictionary mapping atomic numbers to counts.
+    Raises a ValueError for anything else.
+    '''
+    if isinstance(query, str):
+        return parseFormula(query)
+    if not isinstance(query, dict):
+        raise ValueError('Query must be a formula string or an object of element counts')
+    formula = {}
+    for element, count in query.items():
+        try:
+            number = int(element) if element.isdigit() else atomicNumber(element)
+        except KeyError:
+            raise ValueError('Unknown element: ' + element) from None
+        if not 0 < number < len(symbols):
+            raise ValueError('Unknown element: ' + element)
+        if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+            raise ValueError('Invalid count of %s: %r' % (element, count))
+        formula[number] = formula.get(number, 0) + count
+    return formula
+
+
+class LatencyStats:
+    '''
+    Keeps track of request latencies (in seconds) and batch sizes.
+    Only the latest `window` latencies are used for percentiles.
+    '''
+    def __init__(self, window=100000):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+
+    def addBatch(self, latencies):
+        self.latencies.extend(latencies)
+        self.requests += len(latencies)
+        self.batches += 1
+
+    def percentile(self, p, latencies=None):
+        '''
+        Returns the `p`-th percentile (0 <= p <= 100) of the recorded
+        latencies in milliseconds, or None if nothing was recorded yet.
+        '''
+        latencies = sorted(self.latencies) if latencies is None else latencies
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+        return latencies[index] * 1000
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {'requests': self.requests,
+                'batches': self.batches,
+                'meanBatchSize': self.requests / self.batches if self.batches else 0,
+                'p50': self.percentile(50, latencies),
+                'p90': self.percentile(90, latencies),
+                'p99': self.percentile(99, latencies),
+                'max': latencies[-1] * 1000 if latencies else None}
+
+
+class FormulaService:
+    '''
+    Micro-batching formula service. See the module documentation for the
+    protocol.
+
+    Attributes:
+    maxBatch (int): The maximum number of requests per batch.
+    maxDelay (float): The maximum time in seconds to wait for a batch to fill up.
+    workers (int): The number of worker processes; 0 processes batches in a thread.
+    maxQueue (int): The maximum number of queued requests; connections stop being read while the queue is full.
+    stats (LatencyStats): Latencies of the processed requests.
+    '''
+    def __init__(self, maxBatch=256, maxDelay=0.002, workers=0, maxQueue=4096):
+        self.maxBatch = maxBatch
+        self.maxDelay = maxDelay
+        self.workers = workers
+        self.maxQueue = maxQueue
+        self.stats = LatencyStats()
+        self.queue = None
+        self.executor = None
+        self.batcher = None
+        self.server = None
+        self.connections = set()
+
+    async def start(self, host='127.0.0.1', port=0):
+        '''
+        Starts the service and returns the port it is listening on.
+        '''
+        self.queue = asyncio.Queue(self.maxQueue)
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(self.workers)
+        else:
+            self.executor = ThreadPoolExecutor(1)
+        self.batcher = asyncio.ensure_future(self.batchLoop())
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown()
+
+    async def submit(self, request):
+        '''
+        Submits a single request and returns its result. Raises a ValueError
+        if the request failed.
+        '''
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future, time.perf_counter()))
+        return await future
+
+    async def batchLoop(self):
+        pending = set()
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                self.drain(batch)
+                if len(batch) < self.maxBatch and self.maxDelay > 0:
+                    await asyncio.sleep(self.maxDelay)
+                    self.drain(batch)
+                # Batches run concurrently on the pool; keep collecting the
+                # next batch while this one is processed.
+                task = asyncio.ensure_future(self.runBatch(batch))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def drain(self, batch):
+        # Moves queued requests into `batch` without waiting.
+        queue = self.queue
+        while len(batch) < self.maxBatch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    async def runBatch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, processBatch,
+                                                 [request for request, _, _ in batch])
+        except Exception as error:
+            results = [(False, '%s: %s' % (type(error).__name__, error))] * len(batch)
+        now = time.perf_counter()
+        self.stats.addBatch([now - start for _, _, start in batch])
+        for (_, future, _), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(ValueError(value))
+
+    async def request(self, line, writer):
+        '''
+        Parses a request line and queues it for the next batch, waiting while
+        the queue is full. Returns the future of the response, or None if the
+        response was written at once.
+        '''
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Request must be a JSON object')
+        except ValueError as error:
+            self.respond(writer, {'id': None, 'error': str(error)})
+            return None
+        if request.get('op') == 'stats':
+            self.respond(writer, {'id': request.get('id'), 'result': self.stats.summary()})
+            return None
+        # Plain futures and callbacks instead of one task per request keep
+        # the per-request overhead of the event loop low.
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda future: self.respond(writer, self.response(request, future)))
+        if self.queue.full():
+            await self.queue.put((request, future, time.perf_counter()))
+        else:
+            self.queue.put_nowait((request, future, time.perf_counter()))
+        return future
+
+    def response(self, request, future):
+        if future.cancelled():
+            return {'id': request.get('id'), 'error': 'cancelled'}
+        error = future.exception()
+        if error is not None:
+            return {'id': request.get('id'), 'error': str(error)}
+        return {'id': request.get('id'), 'result': future.result()}
+
+    def respond(self, writer, response):
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        futures = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                future = await self.request(line, writer)
+                if future is not None:
+                    futures.add(future)
+                    future.add_done_callback(futures.discard)
+                await writer.drain()
+            if futures:
+                await asyncio.gather(*futures, return_exceptions=True)
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancellation happens when the service is stopped; the
+            # connection is simply closed.
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+
+async def query(requests, host='127.0.0.1', port=8765):
+    '''
+    Sends a list of requests over a single connection and returns the
+    responses in the order of the requests. Requests without an 'id' are
+    numbered automatically.
+    '''
+    reader, writer = await asyncio.open_connection(host, port)
+    ids = []
+    for number, request in enumerate(requests):
+        request = dict(request)
+        request.setdefault('id', number)
+        ids.append(request['id'])
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+    await writer.drain()
+    responses = {}
+    while len(responses) < len(requests):
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        responses[response['id']] = response
+    writer.close()
+    await writer.wait_closed()
+    return [responses.get(id) for id in ids]
+
+
+async def serve(host, port, maxBatch, maxDelay, workers, maxQueue):
+    service = FormulaService(maxBatch, maxDelay, workers, maxQueue)
+    port = await service.start(host, port)
+    print('Serving formulae on %s:%d' % (host, port), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve formula parsing, masses and containment over TCP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of worker processes, 0 for a single thread (default: 0)')
+    parser.add_argument('--max-batch', type=int, default=256,
+                        help='maximum number of requests per batch (default: 256)')
+    parser.add_argument('--max-delay', type=float, default=0.002,
+                        help='maximum seconds to wait for a batch to fill up (default: 0.002)')
+    parser.add_argument('--max-queue', type=int, default=4096,
+                        help='maximum number of queued requests before reading is paused (default: 4096)')
+    args = parser.parse_args(argv)
+    if args.max_queue < 1:
+        parser.error('--max-queue must be positive')
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_delay, args.workers, args.max_queue))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+'''
+Command line tool for computing properties of molecular formulae in bulk.
+
+The input (a file with one formula per line, or standard input) is
+streamed in chunks through parse -> compute -> write, so arbitrarily
+large files can be processed in constant memory. Chunks can be processed
+in parallel by several worker processes; the output keeps the order of
+the input.
+
+Available columns:
+
+    formula     the formula as given in the input
+    hill        the formula in Hill order
+    mass        the molar mass
+    exactMass   the exact mass
+    atoms       the total number of atoms
+    <symbol>    the number of atoms of the given element, e.g. C or Cl
+
+Output formats:
+
+    csv         comma separated values with a header line
+    jsonl       one JSON object per line
+    columns     a chunked, columnar binary format (see `ColumnWriter`)
+
+Example:
+
+    python FormulaTool.py hs23_datalab_formulae.txt --columns hill,mass,C,N -o out.csv
+
+Lines that cannot be parsed are skipped and reported on standard error
+with their line numbers, or abort the run with `--errors fail`.
+'''
+import argparse
+import csv
+import json
+import struct
+import sys
+from collections import deque
+from itertools import islice
+
+from Elements import masses, exactMasses, fromSymbol
+from Formula import FormulaError, parseFormula, printFormula
+
+DEFAULT_COLUMNS = 'formula,hill,mass,exactMass,atoms'
+
+# Formulae repeat a lot in real data sets, so computed rows are memoized
+# per process and set of columns. A memo is simply cleared when it grows
+# too large, which keeps memory bounded for arbitrarily large inputs.
+MEMO_SIZE = 1 << 16
+_memos = {}
+_columns = ()
+
+
+def columnType(column):
+    '''
+    Returns the type of the given column: `str`, `float` or `int`.
+    Raises a ValueError if the column is unknown.
+    '''
+    if column in ('formula', 'hill'):
+        return str
+    if column in ('mass', 'exactMass'):
+        return float
+    if column == 'atoms' or column in fromSymbol:
+        return int
+    raise ValueError('Unknown column: ' + column)
+
+
+def computeRow(line, columns):
+    '''
+    Computes the values of the given columns for a single formula.
+    Returns a tuple with one value per column.
+    '''
+    formula = parseFormula(line)
+    row = []
+    for column in columns:
+        if column == 'formula':
+            row.append(line)
+        elif column == 'hill':
+            row.append(printFormula(formula))
+        elif column == 'mass':
+            row.append(sum(masses[number] * count for number, count in formula.items()))
+        elif column == 'exactMass':
+            row.append(sum(exactMasses[number] * count for number, count in formula.items()))
+        elif column == 'atoms':
+            row.append(sum(formula.values()))
+        else:
+            row.append(formula.get(fromSymbol[column], 0))
+    return tuple(row)
+
+
+def processChunk(lines, columns, errors=None, start=1):
+    '''
+    Computes the rows for a chunk of formulae.
+    `columns` must be a tuple of column names. Empty lines are skipped.
+    Returns a list of tuples.
+    Lines are numbered from `start`. If `errors` is a list, lines that
+    cannot be parsed are appended to it as tuples (lineNumber, reason) and
+    skipped; otherwise a FormulaError carrying the line number is raised.
+    '''
+    rows = []
+    memo = _memos.setdefault(columns, {})
+    for number, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+        row = memo.get(line)
+        if row is None:
+            try:
+                row = computeRow(line, columns)
+            except FormulaError as error:
+                if errors is None:
+                    raise FormulaError(error.string, error.position, error.reason, number) from None
+                errors.append((number, '%s at position %d' % (error.reason, error.position)))
+                continue
+            if len(memo) >= MEMO_SIZE:
+                memo.clear()
+            memo[line] = row
+        rows.append(row)
+    return rows
+
+
+def chunks(lines, size):
+    '''
+    Splits an iterable of lines into lists of at most `size` lines.
+    '''
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _initWorker(columns):
+    # Each worker memoizes rows for its own set of columns.
+    global _columns
+    _columns = columns
+
+
+def _processChunk(lines, start, skip):
+    errors = [] if skip else None
+    return processChunk(lines, _columns, errors, start), errors
+
+
+def processLines(lines, columns, chunkSize=10000, workers=1, errors=None):
+    '''
+    Generator yielding lists of rows, one list per chunk of `chunkSize`
+    input lines, in input order.
+    If `workers` is greater than one, chunks are processed by a pool of
+    worker processes. At most two chunks per worker are in flight at any
+    time, so memory stays bounded even for very large inputs.
+    If `errors` is a list, lines that cannot be parsed are skipped and
+    appended to it as tuples (lineNumber, reason) before the rows of their
+    chunk are yielded; otherwise a FormulaError is raised.
+    '''
+    columns = tuple(columns)
+    for column in columns:
+        columnType(column)
+    if workers <= 1:
+        start = 1
+        for chunk in chunks(lines, chunkSize):
+            yield processChunk(chunk, columns, errors, start)
+            start += len(chunk)
+        return
+    from multiprocessing import Pool
+    skip = errors is not None
+    with Pool(workers, _initWorker, (columns,)) as pool:
+        pending = deque()
+        start = 1
+        for chunk in chunks(lines, chunkSize):
+            pending.append(pool.apply_async(_processChunk, (chunk, start, skip)))
+            start += len(chunk)
+            if len(pending) >= 2 * workers:
+                rows, failed = pending.popleft().get()
+                if skip:
+                    errors.extend(failed)
+                yield rows
+        while pending:
+            rows, failed = pending.popleft().get()
+            if skip:
+                errors.extend(failed)
+            yield rows
+
+
+def reportErrors(errors, file=None):
+    '''
+    Writes tuples (lineNumber, reason) as 'line N: reason' lines to `file`
+    (default: standard error) and empties the list.
+    '''
+    file = sys.stderr if file is None else file
+    for number, reason in errors:
+        file.write('line %d: %s\n' % (number, reason))
+    del errors[:]
+
+
+class CsvWriter:
+    '''
+    Writes rows as comma separated values with a header line.
+    '''
+    def __init__(self, file, columns):
+        self.writer = csv.writer(file, lineterminator='\n')
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    '''
+    Writes rows as one JSON object per line.
+    '''
+    def __init__(self, file, columns):
+        self.file = file
+        self.columns = columns
+
+    def write(self, rows):
+        columns = self.columns
+        self.file.write(''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows))
+
+    def close(self):
+        pass
+
+
+class ColumnWriter:
+    '''
+    Writes rows in a chunked, columnar binary format.
+
+    The file starts with the magic bytes `CFCOL1` and a newline, followed by
+    a JSON header line `{"columns": [[name, type], ...]}` where type is one
+    of 'str', 'float' or 'int'. Then follow the chunks, each consisting of
+
+        4 bytes     number of rows `n` (unsigned int)
+        per column  float: n doubles
+                    int:   n signed 64 bit integers
+                    str:   n+1 offsets (unsigned 64 bit) followed by the
+                           UTF-8 encoded strings
+
+    All numbers are little endian. A chunk with zero rows ends the file.
+    '''
+    MAGIC = b'CFCOL1\n'
+
+    def __init__(self, file, columns):
+        self.file = file
+        self.types = [columnType(column).__name__ for column in columns]
+        file.write(self.MAGIC)
+        header = {'columns': [[column, type] for column, type in zip(columns, self.types)]}
+        file.write(json.dumps(header).encode('utf-8') + b'\n')
+
+    def write(self, rows):
+        if not rows:
+            return
+        n = len(rows)
+        parts = [struct.pack('<I', n)]
+        for values, type in zip(zip(*rows), self.types):
+            if type == 'float':
+                parts.append(struct.pack('<%dd' % n, *values))
+            elif type == 'int':
+                parts.append(struct.pack('<%dq' % n, *values))
+            else:
+                encoded = [value.encode('utf-8') for value in values]
+                offsets = [0]
+                for value in encoded:
+                    offsets.append(offsets[-1] + len(value))
+                parts.append(struct.pack('<%dQ' % (n + 1), *offsets))
+                parts.append(b''.join(encoded))
+        self.file.write(b''.join(parts))
+
+    def close(self):
+        self.file.write(b'\0\0\0\0')
+
+
+def readColumns(file):
+    '''
+    Generator reading a file written by `ColumnWriter`.
+    Yields one dictionary per chunk, mapping column names to lists of values.
+    '''
+    if file.read(len(ColumnWriter.MAGIC)) != ColumnWriter.MAGIC:
+        raise ValueError('Not a columnar formula file')
+    columns = json.loads(file.readline())['columns']
+    while True:
+        n = struct.unpack('<I', file.read(4))[0]
+        if n == 0:
+            return
+        chunk = {}
+        for column, type in columns:
+            if type == 'float':
+                chunk[column] = list(struct.unpack('<%dd' % n, file.read(8 * n)))
+            elif type == 'int':
+                chunk[column] = list(struct.unpack('<%dq' % n, file.read(8 * n)))
+            else:
+                offsets = struct.unpack('<%dQ' % (n + 1), file.read(8 * (n + 1)))
+                data = file.read(offsets[-1])
+                chunk[column] = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(n)]
+        yield chunk
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonLinesWriter, 'columns': ColumnWriter}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute properties of molecular formulae in bulk.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with one formula per line (default: standard input)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: standard output)')
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='csv',
+                        help='output format (default: csv)')
+    parser.add_argument('-c', '--columns', default=DEFAULT_COLUMNS,
+                        help='comma separated list of columns (default: %s)' % DEFAULT_COLUMNS)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='number of lines per chunk (default: 10000)')
+    parser.add_argument('--errors', choices=('skip', 'fail'), default='skip',
+                        help='skip and report unparsable lines, or stop at the first (default: skip)')
+    args = parser.parse_args(argv)
+
+    columns = [column.strip() for column in args.columns.split(',') if column.strip()]
+    try:
+        for column in columns:
+            columnType(column)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+
+    binary = args.format == 'columns'
+    if args.input == '-':
+        source = sys.stdin
+    else:
+        source = open(args.input, 'r')
+    if args.output == '-':
+        target = sys.stdout.buffer if binary else sys.stdout
+    else:
+        target = open(args.output, 'wb' if binary else 'w', **({} if binary else {'newline': ''}))
+    errors = [] if args.errors == 'skip' else None
+    try:
+        writer = WRITERS[args.format](target, columns)
+        for rows in processLines(source, columns, args.chunk_size, args.workers, errors):
+            writer.write(rows)
+            if errors:
+                reportErrors(errors)
+        writer.close()
+    except FormulaError as error:
+        sys.stderr.write('%s\n' % error)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target not in (sys.stdout, sys.stdout.buffer):
+            target.close()
+        else:
+            target.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
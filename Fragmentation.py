@@ -0,0 +1,230 @@
+'''
+Fragments of molecules from breaking one or two bonds, e.g. to interpret
+MS/MS spectra.
+
+Cleavages are not found by removing bonds and searching the remaining
+graph. Instead, every component of a molecule is traversed once:
+
+* A depth first search tree gives, for every tree bond, the formula of the
+  subtree below it as a vector of element counts, so the fragments of a
+  cleavage are sums and differences of a few vectors.
+* Every bond not in the tree gets a random 64 bit label, and every tree
+  bond the XOR of the labels of the non-tree bonds spanning it. A bond is
+  a bridge (breaking it alone splits the molecule) if its label is 0, and
+  two bonds that are not bridges split the molecule if their labels are
+  equal.
+
+Fragments are deduplicated by formula, and exact masses are cached per
+formula. Cleavages are homolytic: every atom keeps its implicit hydrogens.
+
+Example:
+
+    for fragment in fragmentMolecule(molecule):
+        print(fragment.formula, fragment.exactMass, len(fragment.cleavages))
+'''
+import random
+from operator import add, sub
+
+from Formula import Formula, printFormula
+
+# Exact masses by Hill formula, shared by all molecules. Cleared when it
+# grows too large, which keeps memory bounded for large libraries.
+CACHE_SIZE = 1 << 16
+_exactMasses = {}
+
+
+def exactMass(formula, counts):
+    '''
+    Returns the exact mass of a formula given as a Hill formula string and
+    a dictionary mapping atomic numbers to counts, cached by the string.
+    '''
+    mass = _exactMasses.get(formula)
+    if mass is None:
+        if len(_exactMasses) >= CACHE_SIZE:
+            _exactMasses.clear()
+        mass = _exactMasses[formula] = Formula(counts).exactMass()
+    return mass
+
+
+class Fragment:
+    '''
+    This class represents a fragment of a molecule.
+
+    Attributes:
+    formula (str): The Hill formula of the fragment.
+    counts (dict): Maps atomic numbers to counts.
+    exactMass (float): The exact mass of the fragment.
+    cleavages (list): The cleavages producing the fragment, as tuples of broken bonds (pairs of atom indices).
+    '''
+    def __init__(self, formula, counts, exactMass):
+        self.formula = formula
+        self.counts = counts
+        self.exactMass = exactMass
+        self.cleavages = []
+
+    def __repr__(self):
+        return 'Fragment(%s, %.6f)' % (self.formula, self.exactMass)
+
+
+def _cleavages(molecule, maxBonds, seed):
+    # Returns a tuple (elements, cleavages), where `cleavages` generates
+    # tuples (bonds, vectors) with the fragments as tuples of counts of
+    # `elements`.
+    mol = molecule.mol
+    elements = {atom.element for atom, _ in mol.values()}
+    if any(atom.hydrogens for atom, _ in mol.values()):
+        elements.add(1)
+    elements = sorted(elements)
+    position = {element: index for index, element in enumerate(elements)}
+    hydrogen = position.get(1)
+    rng = random.Random(seed)
+
+    def own(atom):
+        vector = [0] * len(elements)
+        vector[position[atom.element]] += 1
+        if atom.hydrogens:
+            vector[hydrogen] += atom.hydrogens
+        return vector
+
+    def generate():
+        parent = {}
+        for root in mol:
+            if root in parent:
+                continue
+            # Iterative depth first search, recording the preorder and the
+            # bonds not in the tree (each seen from its lower end).
+            parent[root] = None
+            entry = {root: 0}
+            order = [root]
+            nonTree = []
+            stack = [(root, iter(mol[root][1]))]
+            while stack:
+                node, neighbors = stack[-1]
+                for neighbor in neighbors:
+                    if neighbor not in parent:
+                        parent[neighbor] = node
+                        entry[neighbor] = len(order)
+                        order.append(neighbor)
+                        stack.append((neighbor, iter(mol[neighbor][1])))
+                        break
+                    if neighbor != parent[node] and entry[neighbor] < entry[node]:
+                        nonTree.append((neighbor, node))
+                else:
+                    stack.pop()
+
+            vectors = {node: own(mol[node][0]) for node in order}
+            labels = dict.fromkeys(order, 0)
+            sizes = dict.fromkeys(order, 1)
+            nonTreeLabels = []
+            for u, v in nonTree:
+                label = rng.getrandbits(64)
+                labels[u] ^= label
+                labels[v] ^= label
+                nonTreeLabels.append((label, (min(u, v), max(u, v))))
+            for node in reversed(order):
+                above = parent[node]
+                if above is not None:
+                    vectors[above] = list(map(add, vectors[above], vectors[node]))
+                    labels[above] ^= labels[node]
+                    sizes[above] += sizes[node]
+            vectors = {node: tuple(vector) for node, vector in vectors.items()}
+            total = vectors[root]
+
+            def bond(child):
+                return min(child, parent[child]), max(child, parent[child])
+
+            def below(ancestor, node):
+                return entry[ancestor] <= entry[node] < entry[ancestor] + sizes[ancestor]
+
+            bridges = []
+            groups = {}
+            for child in order[1:]:
+                if labels[child]:
+                    groups.setdefault(labels[child], []).append(child)
+                else:
+                    bridges.append(child)
+            for label, edge in nonTreeLabels:
+                groups.setdefault(label, []).append(edge)
+
+            for child in bridges:
+                yield (bond(child),), (vectors[child], tuple(map(sub, total, vectors[child])))
+            if maxBonds < 2:
+                continue
+            # Two bridges split the component into three fragments. A bridge
+            # and a bond on a ring give the fragments of the bridge alone,
+            # so those pairs are skipped.
+            for i, first in enumerate(bridges):
+                for second in bridges[i + 1:]:
+                    if below(first, second) or below(second, first):
+                        upper, lower = (first, second) if below(first, second) else (second, first)
+                        middle = tuple(map(sub, vectors[upper], vectors[lower]))
+                        rest = tuple(map(sub, total, vectors[upper]))
+                        yield (bond(first), bond(second)), (vectors[lower], middle, rest)
+                    else:
+                        both = tuple(map(add, vectors[first], vectors[second]))
+                        yield (bond(first), bond(second)), (vectors[first], vectors[second],
+                                                            tuple(map(sub, total, both)))
+            # Bonds on rings with equal labels split the component in two.
+            for members in groups.values():
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        tree, other = (second, first) if isinstance(first, tuple) else (first, second)
+                        if isinstance(tree, tuple):
+                            # Two non-tree bonds never form a cut; equal
+                            # labels would be a (negligible) collision.
+                            continue
+                        if isinstance(other, tuple):
+                            part = vectors[tree]
+                            bonds = (bond(tree), other)
+                        elif below(tree, other) or below(other, tree):
+                            upper, lower = (tree, other) if below(tree, other) else (other, tree)
+                            part = tuple(map(sub, vectors[upper], vectors[lower]))
+                            bonds = (bond(tree), bond(other))
+                        else:
+                            part = tuple(map(add, vectors[tree], vectors[other]))
+                            bonds = (bond(tree), bond(other))
+                        yield bonds, (part, tuple(map(sub, total, part)))
+
+    return elements, generate()
+
+
+def cleavages(molecule, maxBonds=2, seed=0):
+    '''
+    Generator yielding every cleavage of one or (if `maxBonds` is 2) two
+    bonds that splits a component of the molecule, as tuples (bonds,
+    fragments): the broken bonds as pairs of atom indices, and the
+    resulting fragments as dictionaries mapping atomic numbers to counts.
+    Both bonds of a pair lie in the same component, and pairs of a bridge
+    and a ring bond are skipped, as they give the same fragments as the
+    bridge alone. `seed` seeds the random bond labels.
+    '''
+    elements, generator = _cleavages(molecule, maxBonds, seed)
+    for bonds, vectors in generator:
+        yield bonds, [{element: count for element, count in zip(elements, vector) if count}
+                      for vector in vectors]
+
+
+def fragmentMolecule(molecule, maxBonds=2, seed=0):
+    '''
+    Returns the distinct fragments from breaking one or two bonds of the
+    molecule as a list of `Fragment` objects, heaviest first. Every fragment
+    lists all cleavages producing it, each once.
+    '''
+    elements, generator = _cleavages(molecule, maxBonds, seed)
+    fragments = {}
+    for bonds, vectors in generator:
+        # A symmetric cleavage (e.g. of ethane) gives the same fragment twice.
+        for vector in set(vectors):
+            fragment = fragments.get(vector)
+            if fragment is None:
+                counts = {element: count for element, count in zip(elements, vector) if count}
+                formula = printFormula(counts)
+                fragment = fragments[vector] = Fragment(formula, counts, exactMass(formula, counts))
+            fragment.cleavages.append(bonds)
+    return sorted(fragments.values(), key=lambda fragment: (-fragment.exactMass, fragment.formula))
+
+
+if __name__ == '__main__':
+    from Molecule import tyrosineHCl
+    for fragment in fragmentMolecule(tyrosineHCl()):
+        print('%-12s %12.6f %4d' % (fragment.formula, fragment.exactMass, len(fragment.cleavages)))
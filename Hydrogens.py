@@ -0,0 +1,92 @@
+'''
+Conversion of molecules between implicit and explicit hydrogens.
+
+The functions here are used through `Molecule.addHydrogens` and
+`Molecule.removeHydrogens` and are only imported when first needed. Like
+`Molecule.from_arrays`, they share Atom objects by label.
+
+Example:
+
+    for molecule in convertHydrogens(molecules, explicit=False):
+        print(molecule.formula())
+'''
+from Molecule import Molecule, _sharedAtoms
+
+
+def addHydrogens(molecule):
+    '''
+    Returns a new molecule in which the implicit hydrogens of every atom
+    are explicit hydrogen atoms. Atoms keep their indices; the hydrogens
+    are appended after them, grouped by the atom they are bonded to.
+    All hydrogens share a single Atom object.
+    '''
+    count = len(molecule.mol)
+    labels = [(atom.element, 0, atom.charge) for atom, _ in molecule.mol.values()]
+    labels.append((1, 0, 0))
+    atoms = _sharedAtoms(labels)
+    hydrogen = atoms.pop()
+    parents = [node for node, (atom, _) in molecule.mol.items() for _ in range(atom.hydrogens)]
+    atoms.extend([hydrogen] * len(parents))
+    result = Molecule(atoms, [])
+    mol = {node: (atoms[node], dict(neighbors)) for node, (_, neighbors) in molecule.mol.items()}
+    edges = list(molecule.edges)
+    for index, parent in enumerate(parents, count):
+        mol[parent][1][index] = 1
+        mol[index] = (hydrogen, {parent: 1})
+        edges.append((parent, index, 1))
+    result.mol = mol
+    result.edges = edges
+    return result
+
+
+def removeHydrogens(molecule):
+    '''
+    Returns a tuple (molecule, indices) of a new molecule in which
+    explicit hydrogen atoms are implicit hydrogens of the atom they are
+    bonded to, and the list mapping the atoms of the new molecule to
+    their indices in the given one. Only uncharged hydrogens with a single
+    bond to a heavy atom are removed, so e.g. H2 and H+ stay explicit.
+    An atom takes up hydrogens only as long as its implicit hydrogens plus
+    its charge stay at most 4, the limit enforced by `Atom`; the hydrogens
+    beyond that (those with the highest indices) stay explicit. So in
+    explicit NH4+, one hydrogen stays explicit.
+    '''
+    mol = molecule.mol
+    removed = {}
+    added = {}
+    for node, (atom, neighbors) in mol.items():
+        if atom.element == 1 and atom.charge == 0 and atom.hydrogens == 0 and len(neighbors) == 1:
+            (parent, bond), = neighbors.items()
+            parentAtom = mol[parent][0]
+            if (bond == 1 and parentAtom.element != 1
+                    and parentAtom.hydrogens + parentAtom.charge + added.get(parent, 0) < 4):
+                removed[node] = parent
+                added[parent] = added.get(parent, 0) + 1
+    if not removed:
+        return Molecule(molecule.atom, molecule.edges), list(range(len(mol)))
+    indices = [node for node in range(len(mol)) if node not in removed]
+    position = {node: index for index, node in enumerate(indices)}
+    labels = [(atom.element, atom.hydrogens + added.get(node, 0), atom.charge)
+              for node in indices for atom in (mol[node][0],)]
+    atoms = _sharedAtoms(labels)
+    result = Molecule(atoms, [])
+    result.mol = {index: (atom, {position[neighbor]: bond for neighbor, bond in mol[node][1].items()
+                                 if neighbor not in removed})
+                  for index, (node, atom) in enumerate(zip(indices, atoms))}
+    result.edges = [(position[a], position[b], bond) for a, b, bond in molecule.edges
+                    if a not in removed and b not in removed]
+    return result, indices
+
+
+def convertHydrogens(molecules, explicit=True):
+    '''
+    Generator converting the molecules of an iterable to explicit (or, with
+    `explicit=False`, implicit) hydrogens. Yields the converted molecules;
+    see `addHydrogens` and `removeHydrogens`.
+    '''
+    if explicit:
+        for molecule in molecules:
+            yield addHydrogens(molecule)
+    else:
+        for molecule in molecules:
+            yield removeHydrogens(molecule)[0]
@@ -34,9 +34,72 @@
 # a) Define a new class called `Molecule` that encapsulates the representation
 #    above in a field called `mol`.
 
-from Atom import Atom, info
+
+from Atom import Atom
+from Elements import symbols
 from Formula import Formula, atomicNumber
 
+# Maximum number of bonds (bond orders plus implicit hydrogens) of neutral
+# atoms of common elements, used to validate molecules. Charged atoms may
+# exceed this by the absolute value of their charge. Other elements are
+# not checked.
+maxValence = {1: 1, 5: 3, 6: 4, 7: 3, 8: 2, 9: 1, 14: 4, 15: 5, 16: 6, 17: 1, 35: 1, 53: 1}
+
+
+def _toList(values):
+    # Converts NumPy arrays (or anything with `tolist`) to lists of Python
+    # numbers, leaving other sequences alone.
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _first(values, predicate):
+    # Returns the index of the first value satisfying `predicate`.
+    for index, value in enumerate(values):
+        if predicate(value):
+            return index
+    return None
+
+
+def _integers(values, message):
+    # Returns the values as Python integers (via `operator.index`, so e.g.
+    # NumPy integers work but floats do not), or raises a ValueError with
+    # `message` formatted with the index of the first other value.
+    # Booleans are rejected although they are integers.
+    from operator import index
+    if bool not in set(map(type, values)):
+        try:
+            return list(map(index, values))
+        except TypeError:
+            pass
+    position = _first(values, lambda value: isinstance(value, bool) or not hasattr(type(value), '__index__'))
+    raise ValueError(message % position)
+
+
+def _atom(element, hydrogens, charge):
+    # Creates an already validated `Atom` without calling its constructor
+    # and registers its valence limit (unchecked elements get a limit that is never exceeded).
+    atom = Atom.__new__(Atom)
+    atom.element = element
+    atom.hydrogens = hydrogens
+    atom.charge = charge
+    limit = maxValence.get(element)
+    _valenceLimits[element, hydrogens, charge] = 1 << 30 if limit is None else limit + abs(charge)
+    return atom
+
+
+def _sharedAtoms(labels):
+    # Returns the shared atoms for a list of labels (element, hydrogens, charge).
+    for label in set(labels).difference(_atoms):
+        _atoms[label] = _atom(*label)
+    return list(map(_atoms.__getitem__, labels))
+
+
+# Shared atoms and their valence limits by (element, hydrogens, charge),
+# filled by `_sharedAtoms`.
+_atoms = {}
+_valenceLimits = {}
+
+
 class Molecule:
     '''
     This class represents a molecule.
@@ -47,6 +110,9 @@ class Molecule:
     edges (list): A list of tuples representing the bonds in the molecule. Each tuple contains two atom indices and a bond type.
 
     Methods:
+    from_arrays(elements, hydrogens, charges, edge_src, edge_dst, bond_order): Creates a validated molecule from parallel arrays.
+    fromCsr(elements, hydrogens, charges, indptr, indices, orders): Creates a molecule from arrays with bonds in CSR form.
+    toCsr(): Returns the molecule as arrays with bonds in CSR form.
     order(): Returns the number of atoms in the molecule.
     size(): Returns the number of bonds in the molecule.
     degree(node): Returns the number of bonds connected to the given atom.
@@ -55,20 +121,174 @@ class Molecule:
     mass(): Returns the total mass of the molecule.
     exactMass(): Returns the exact mass of the molecule.
     formula(): Returns the chemical formula of the molecule as a string.
+    toFormula(): Returns the chemical formula of the molecule as a Formula.
     hasElement(element): Returns True if the molecule contains the given element, False otherwise.
     isElement(element): Returns True if all atoms in the molecule are of the given element, False otherwise.
     isSubstructure(other): Returns True if the molecule is a substructure of the other molecule, False otherwise.
     isSubgraph(other): Returns True if the molecule is a subgraph of the other molecule, False otherwise.
+    components(): Returns the connected components of the molecule as lists of atom indices.
+    cycleRank(): Returns the number of independent cycles (rings) of the molecule.
+    rings(): Returns the smallest set of smallest rings (SSSR) as lists of atom indices.
+    ringCount(): Returns the number of rings in the SSSR.
+    isRingAtom(node): Returns True if the given atom is part of a ring, False otherwise.
+    isRingBond(node1, node2): Returns True if the bond between the given atoms is part of a ring, False otherwise.
+    atomRings(node): Returns the rings of the SSSR containing the given atom.
+    canonicalOrder(): Returns the atom indices in canonical order.
+    canonicalString(): Returns a canonical string representation of the molecule.
+    canonicalHash(): Returns a stable hash of the canonical string.
+    findSubstructure(query): Returns a mapping of the atoms of query onto atoms of the molecule, or None.
+    hasSubstructure(query): Returns True if query is a substructure of the molecule, False otherwise.
+    distanceMatrix(): Returns the topological distances between all pairs of atoms.
+    distance(node1, node2): Returns the number of bonds on a shortest path between the given atoms, or None.
+    eccentricity(node): Returns the largest distance between the given atom and any atom of its component.
+    diameter(): Returns the largest eccentricity of the atoms of the largest component.
+    radius(): Returns the smallest eccentricity of the atoms of the largest component.
+    wienerIndex(): Returns the sum of the distances between all pairs of connected atoms.
+    addHydrogens(): Returns a copy of the molecule with explicit hydrogen atoms.
+    removeHydrogens(): Returns a copy of the molecule with implicit hydrogens, and the mapping of its atoms.
+    bfs(start, maxDepth): Iterates over the atoms reachable from the given atom in breadth first order.
+    dfs(start, maxDepth): Iterates over the atoms reachable from the given atom in depth first order.
+    neighborhood(node, k): Returns the atoms within k bonds of the given atom.
+    subgraph(nodes): Returns the molecule induced by the given atoms.
     '''
     def __init__(self, atoms, edges):
-        self.mol = {}
         self.atom = atoms
         self.edges = edges
-        for i in range(len(atoms)):
-            self.mol[i] = (atoms[i], {})
+        self.mol = {i: (atom, {}) for i, atom in enumerate(atoms)}
         for edge in edges:
             self.mol[edge[0]][1][edge[1]] = edge[2]
             self.mol[edge[1]][1][edge[0]] = edge[2]
+        self._rings = None
+        self._canonical = None
+        self._distances = None
+
+    @classmethod
+    def from_arrays(cls, elements, hydrogens, charges, edge_src, edge_dst, bond_order):
+        '''
+        Creates a molecule from parallel arrays (lists, tuples or NumPy
+        arrays): per atom its element (atomic number or symbol), number of
+        implicit hydrogens and charge, and per bond its two atom indices and
+        bond order.
+
+        Everything is validated while the molecule is built. Raises a
+        ValueError if the arrays differ in length, a value other than an
+        element symbol is not an integer (floats and booleans are rejected),
+        an element is unknown,
+        a hydrogen count or bond order is out of range, a bond refers to a
+        missing atom, connects an atom to itself or is given twice, or an
+        atom has more bonds than its valence allows.
+
+        Atoms with equal labels are shared between all molecules created
+        this way and must not be modified.
+        '''
+        # operator is imported here since compiling it adds noticeably to
+        # the import time of this module.
+        import operator
+        elements, hydrogens, charges = _toList(elements), _toList(hydrogens), _toList(charges)
+        src, dst, orders = _toList(edge_src), _toList(edge_dst), _toList(bond_order)
+        n, m = len(elements), len(src)
+        if len(hydrogens) != n or len(charges) != n:
+            raise ValueError('elements, hydrogens and charges must have the same length')
+        if len(dst) != m or len(orders) != m:
+            raise ValueError('edge_src, edge_dst and bond_order must have the same length')
+        if str in set(map(type, elements)):
+            try:
+                elements = [atomicNumber(element) if isinstance(element, str) else element for element in elements]
+            except KeyError as error:
+                index = _first(elements, lambda e: isinstance(e, str) and e == error.args[0])
+                raise ValueError('Unknown element %r at atom %d' % (error.args[0], index)) from None
+        elements = _integers(elements, 'Element must be an atomic number or symbol at atom %d')
+        hydrogens = _integers(hydrogens, 'Number of hydrogens must be an integer at atom %d')
+        charges = _integers(charges, 'Charge must be an integer at atom %d')
+        src = _integers(src, 'Atom index must be an integer at bond %d')
+        dst = _integers(dst, 'Atom index must be an integer at bond %d')
+        orders = _integers(orders, 'Bond order must be an integer at bond %d')
+        if n and not (1 <= min(elements) and max(elements) < len(symbols)):
+            raise ValueError('Unknown element at atom %d' % _first(elements, lambda e: not 1 <= e < len(symbols)))
+        if n and min(hydrogens) < 0:
+            raise ValueError('Negative number of hydrogens at atom %d' % _first(hydrogens, lambda h: h < 0))
+        if n and max(hydrogens) + max(charges) > 4:
+            index = _first(list(map(operator.add, hydrogens, charges)), lambda v: v > 4)
+            if index is not None:
+                raise ValueError('Sum of implicit hydrogens and charge must be <= 4 at atom %d' % index)
+        if m:
+            if not (0 <= min(src) and 0 <= min(dst) and max(src) < n and max(dst) < n):
+                index = _first(list(map(max, src, dst)), lambda i: i >= n)
+                if index is None:
+                    index = _first(list(map(min, src, dst)), lambda i: i < 0)
+                raise ValueError('Bond %d refers to a missing atom' % index)
+            if not (1 <= min(orders) and max(orders) <= 3):
+                raise ValueError('Bond order must be 1, 2 or 3 at bond %d' % _first(orders, lambda o: not 1 <= o <= 3))
+
+        # Atoms are shared by label, so building them is a dictionary lookup.
+        # Then the adjacency and the valence sums are built in a single pass
+        # over the bonds.
+        labels = list(zip(elements, hydrogens, charges))
+        atoms = _sharedAtoms(labels)
+        molecule = cls(atoms, [])
+        molecule.edges = list(zip(src, dst, orders))
+        neighbors = [neighbors for _, neighbors in molecule.mol.values()]
+        valence = list(hydrogens)
+        for a, b, order in molecule.edges:
+            neighbors[a][b] = order
+            neighbors[b][a] = order
+            valence[a] += order
+            valence[b] += order
+        # Self loops and bonds given twice show up as missing neighbors.
+        if sum(map(len, neighbors)) != 2 * m:
+            seen = set()
+            for index, (a, b, _) in enumerate(molecule.edges):
+                if a == b:
+                    raise ValueError('Bond %d connects an atom to itself' % index)
+                if (min(a, b), max(a, b)) in seen:
+                    raise ValueError('Bond %d (%d-%d) is given twice' % (index, min(a, b), max(a, b)))
+                seen.add((min(a, b), max(a, b)))
+        limits = list(map(_valenceLimits.__getitem__, labels))
+        if any(map(operator.gt, valence, limits)):
+            index = _first(list(map(operator.gt, valence, limits)), bool)
+            raise ValueError('Atom %d (%s) exceeds its valence of %d'
+                             % (index, symbols[elements[index]], limits[index]))
+        return molecule
+
+    @classmethod
+    def fromCsr(cls, elements, hydrogens, charges, indptr, indices, orders):
+        '''
+        Creates a molecule from per atom arrays (atomic numbers, implicit
+        hydrogens, charges) and its bonds in compressed sparse row form: the
+        neighbors of atom i are `indices[indptr[i]:indptr[i+1]]` with bond
+        orders `orders[indptr[i]:indptr[i+1]]`, so every bond is listed for
+        both of its atoms. Any sequences of integers work, including
+        memoryviews.
+
+        Nothing is validated, so this is meant for trusted data such as the
+        output of `toCsr`. Atoms are shared as in `from_arrays`.
+        '''
+        labels = list(zip(elements, hydrogens, charges))
+        atoms = _sharedAtoms(labels)
+        molecule = cls(atoms, [])
+        molecule.mol = {node: (atom, dict(zip(indices[indptr[node]:indptr[node + 1]],
+                                               orders[indptr[node]:indptr[node + 1]])))
+                        for node, atom in enumerate(atoms)}
+        molecule.edges = [(node, neighbor, bond) for node, (_, neighbors) in molecule.mol.items()
+                          for neighbor, bond in neighbors.items() if node < neighbor]
+        return molecule
+
+    def toCsr(self):
+        '''
+        Returns the molecule as a tuple of lists (elements, hydrogens,
+        charges, indptr, indices, orders) as expected by `fromCsr`.
+        '''
+        elements, hydrogens, charges = [], [], []
+        indptr, indices, orders = [0], [], []
+        for node in range(len(self.mol)):
+            atom, neighbors = self.mol[node]
+            elements.append(atom.element)
+            hydrogens.append(atom.hydrogens)
+            charges.append(atom.charge)
+            indices.extend(neighbors)
+            orders.extend(neighbors.values())
+            indptr.append(len(indices))
+        return elements, hydrogens, charges, indptr, indices, orders
 
     def __str__(self):
         return str(self.mol)
@@ -83,7 +303,7 @@ class Molecule:
         size = 0
         for atom in self.mol:
             size += len(self.mol[atom][1])
-        return size/2
+        return size // 2
 
     def degree(self, node):
         return len(self.mol[node][1])
@@ -101,22 +321,19 @@ class Molecule:
         return sum([atom.exactMass() for atom, _ in self.mol.values()])
 
     def formula(self):
-        formula_dict = {}  # Initialize an empty dictionary for the formula
-        for atom in self.atom:
-            element = atomicNumber(atom.element)  # Convert the element to an atomic number
-            # Add the atom to the formula
-            if element in formula_dict:
-                formula_dict[element] += 1
-            else:
-                formula_dict[element] = 1
-            # Add the hydrogen atoms to the formula
-            hydrogens = atom.hydrogens
-            if 1 in formula_dict:
-                formula_dict[1] += hydrogens
-            else:
-                formula_dict[1] = hydrogens
-        formula = Formula(formula_dict)  # Create a Formula object from the dictionary
-        return str(formula)  # Return the formula as a string  # Return the formula as a string
+        return str(self.toFormula())  # Return the formula as a string
+
+    def toFormula(self):
+        '''
+        Returns the molecular formula of the molecule (including implicit
+        hydrogens) as a `Formula`.
+        '''
+        counts = {}
+        for atom, _ in self.mol.values():
+            counts[atom.element] = counts.get(atom.element, 0) + 1
+            if atom.hydrogens:
+                counts[1] = counts.get(1, 0) + atom.hydrogens
+        return Formula(counts)
 
     def hasElement(self, element):
         for atom, _ in self.mol.values():
@@ -151,6 +368,214 @@ class Molecule:
                 if neighbor not in self.mol[node][1] or self.mol[node][1][neighbor] != bond:
                     return False
         return True
+
+    def components(self):
+        '''
+        Returns the connected components of the molecule as a list of
+        sorted lists of atom indices.
+        '''
+        seen = set()
+        components = []
+        for start in self.mol:
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            for node in component:
+                for neighbor in self.mol[node][1]:
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        component.append(neighbor)
+            components.append(sorted(component))
+        return components
+
+    def cycleRank(self):
+        '''
+        Returns the number of independent cycles of the molecule, which is
+        the number of rings in its smallest set of smallest rings.
+        This takes linear time and does not need to perceive the rings.
+        '''
+        return self.size() - self.order() + len(self.components())
+
+    def rings(self):
+        '''
+        Returns the smallest set of smallest rings (SSSR) of the molecule,
+        i.e. a minimum cycle basis, as a list of rings. Each ring is a list
+        of atom indices in ring order, starting at its lowest index.
+        Rings are sorted by size. The result is computed once and cached.
+        '''
+        return [list(ring) for ring in self._ringData()[0]]
+
+    def ringCount(self):
+        return self.cycleRank()
+
+    def isRingAtom(self, node):
+        return node in self._ringData()[1]
+
+    def isRingBond(self, node1, node2):
+        return (min(node1, node2), max(node1, node2)) in self._ringData()[2]
+
+    def atomRings(self, node):
+        '''
+        Returns the rings of the SSSR containing the given atom.
+        '''
+        rings, ringAtoms, _ = self._ringData()
+        return [list(rings[index]) for index in ringAtoms.get(node, ())]
+
+    def _ringData(self):
+        # Ring perception lives in `Rings`, which is imported on first use.
+        if self._rings is None:
+            from Rings import perceiveRings
+            self._rings = perceiveRings(self)
+        return self._rings
+
+    def canonicalOrder(self):
+        '''
+        Returns the atom indices of the molecule in canonical order: two
+        molecules describing the same compound (with arbitrarily numbered
+        atoms) yield the same sequence of atoms and bonds in this order.
+        The result is computed once and cached.
+        '''
+        return list(self._canonicalData()[0])
+
+    def canonicalString(self):
+        '''
+        Returns a canonical string representation of the molecule: the
+        atoms in canonical order followed by the bonds (pairs of canonical
+        positions plus bond order). Equal strings mean equal molecules, so
+        the string can be used for set or dictionary based deduplication.
+        '''
+        return self._canonicalData()[1]
+
+    def canonicalHash(self):
+        '''
+        Returns a stable 64 bit hash of the canonical string. Unlike `hash`,
+        the value does not change between Python processes.
+        '''
+        return self._canonicalData()[2]
+
+    def _canonicalData(self):
+        # Canonical labeling lives in `Canonical`, which is imported on first use.
+        if self._canonical is None:
+            from Canonical import canonicalize
+            self._canonical = canonicalize(self)
+        return self._canonical
+
+    def findSubstructure(self, query):
+        '''
+        Searches for the molecule `query` as a substructure of this molecule
+        (see `Screening.findSubstructure`). Returns a dictionary mapping the
+        atoms of the query to atoms of this molecule, or None.
+        '''
+        from Screening import findSubstructure
+        return findSubstructure(self, query)
+
+    def hasSubstructure(self, query):
+        return self.findSubstructure(query) is not None
+
+    def distanceMatrix(self):
+        '''
+        Returns the topological distances (number of bonds on a shortest
+        path) between all pairs of atoms as a list of lists. Entries for
+        atoms in different components are None. The matrix is computed once
+        by a breadth first search from every atom and cached.
+        '''
+        return [list(row) for row in self._distanceMatrix()]
+
+    def distance(self, node1, node2):
+        return self._distanceMatrix()[node1][node2]
+
+    def eccentricity(self, node):
+        '''
+        Returns the largest distance between the given atom and any atom of
+        its component.
+        '''
+        from Distances import eccentricity
+        return eccentricity(self, node)
+
+    def diameter(self):
+        '''
+        Returns the largest eccentricity of the atoms of the largest
+        component (see `Distances`), or 0 for an empty molecule.
+        '''
+        from Distances import diameter
+        return diameter(self)
+
+    def radius(self):
+        '''
+        Returns the smallest eccentricity of the atoms of the largest
+        component (see `Distances`), or 0 for an empty molecule.
+        '''
+        from Distances import radius
+        return radius(self)
+
+    def wienerIndex(self):
+        '''
+        Returns the Wiener index, the sum of the distances between all pairs
+        of connected atoms.
+        '''
+        from Distances import wienerIndex
+        return wienerIndex(self)
+
+    def _distanceMatrix(self):
+        if self._distances is None:
+            from Distances import computeDistances
+            self._distances = computeDistances(self)
+        return self._distances
+
+    def addHydrogens(self):
+        '''
+        Returns a new molecule in which the implicit hydrogens of every atom
+        are explicit hydrogen atoms appended after the other atoms (see
+        `Hydrogens.addHydrogens`).
+        '''
+        from Hydrogens import addHydrogens
+        return addHydrogens(self)
+
+    def removeHydrogens(self):
+        '''
+        Returns a tuple (molecule, indices) of a new molecule in which
+        explicit hydrogen atoms are implicit hydrogens, and the list mapping
+        its atoms to their indices in this one (see
+        `Hydrogens.removeHydrogens`).
+        '''
+        from Hydrogens import removeHydrogens
+        return removeHydrogens(self)
+
+    def bfs(self, start, maxDepth=None):
+        '''
+        Generator yielding tuples (node, depth) of the atoms reachable from
+        `start` in breadth first order, where depth is the distance to
+        `start`. With `maxDepth`, atoms further away are not visited.
+        '''
+        from Traversal import bfs
+        return bfs(self, start, maxDepth)
+
+    def dfs(self, start, maxDepth=None):
+        '''
+        Generator yielding tuples (node, depth) of the atoms reachable from
+        `start` in depth first preorder, where depth is the depth in the
+        search tree. With `maxDepth`, the search does not go deeper.
+        '''
+        from Traversal import dfs
+        return dfs(self, start, maxDepth)
+
+    def neighborhood(self, node, k):
+        '''
+        Returns the sorted atom indices within `k` bonds of the given atom,
+        including the atom itself.
+        '''
+        from Traversal import neighborhood
+        return neighborhood(self, node, k)
+
+    def subgraph(self, nodes):
+        '''
+        Returns the molecule induced by the given atom indices: atom i of
+        the new molecule is atom nodes[i] of this one, and all bonds between
+        the given atoms are kept. Atom objects are shared, not copied.
+        '''
+        from Traversal import subgraph
+        return subgraph(self, nodes)
     
 #    b) Define a constructor for molecules that takes a list of
 #    atoms (the node labels) plus a list of edges (triples consisting
@@ -179,7 +604,7 @@ class Molecule:
 #    end of this source file. Feel free to use it to the functions you are
 #    going to implement now.
 
-test = Molecule([Atom("C",3),Atom("C",2),Atom("O",1)],[(0,1,1),(1,2,1)])
+# test = Molecule([Atom("C",3),Atom("C",2),Atom("O",1)],[(0,1,1),(1,2,1)])
 # print(test.mol)
 
 # c) The "order" of a graph is the number of nodes it has. Add function
@@ -288,6 +713,20 @@ def findPath(molecule, node1, node2, visited=None):
 
 # print(findPath(test, 0, 2))
 
+
+# Functions that moved to their own modules, together with the code they
+# use, so that importing this module stays cheap. They are imported from
+# there on first access.
+_moved = {'shortestPath': 'Distances', 'topologicalDescriptors': 'Distances',
+          'convertHydrogens': 'Hydrogens', 'uniqueMolecules': 'Canonical'}
+
+
+def __getattr__(name):
+    module = _moved.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    return getattr(__import__(module), name)
+
 #
 # l) Even if you haven't finished everything, you might want to test
 #    your code with the following non-trivial molecule (tyrosine
@@ -295,34 +734,38 @@ def findPath(molecule, node1, node2, visited=None):
 #
 #
 # ```
-tyrosineHCl = Molecule([ Atom("N",3,1),   #0
-                        Atom("C",1),     #1
-                        Atom("C"),       #2
-                        Atom("O"),       #3
-                        Atom("O",1),     #4
-                        Atom("C",2),     #5
-                        Atom("C"),       #6
-                        Atom("C",1),     #7
-                        Atom("C",1),     #8
-                        Atom("C"),       #9
-                        Atom("C",1),     #10
-                        Atom("C",1),     #11
-                        Atom("O",1),     #12
-                        Atom("Cl",0,-1)],#13
-                        [ (0,1,1),
-                        (1,2,1),
-                        (1,5,1),
-                        (2,3,2),
-                        (2,4,1),
-                        (5,6,1),
-                        (6,7,1),
-                        (6,11,2),
-                        (7,8,2),
-                        (8,9,1),
-                        (9,10,2),
-                        (9,12,1),
-                        (10,11,1) ]
-                        )
+def tyrosineHCl():
+    '''
+    Returns a new molecule of tyrosine hydro chloride.
+    '''
+    return Molecule([ Atom("N",3,1),   #0
+                    Atom("C",1),     #1
+                    Atom("C"),       #2
+                    Atom("O"),       #3
+                    Atom("O",1),     #4
+                    Atom("C",2),     #5
+                    Atom("C"),       #6
+                    Atom("C",1),     #7
+                    Atom("C",1),     #8
+                    Atom("C"),       #9
+                    Atom("C",1),     #10
+                    Atom("C",1),     #11
+                    Atom("O",1),     #12
+                    Atom("Cl",0,-1)],#13
+                    [ (0,1,1),
+                    (1,2,1),
+                    (1,5,1),
+                    (2,3,2),
+                    (2,4,1),
+                    (5,6,1),
+                    (6,7,1),
+                    (6,11,2),
+                    (7,8,2),
+                    (8,9,1),
+                    (9,10,2),
+                    (9,12,1),
+                    (10,11,1) ]
+                    )
 # ```
 #    Its order is 14.
 #    Its size is 13.
@@ -334,15 +777,17 @@ tyrosineHCl = Molecule([ Atom("N",3,1),   #0
 #    Node 13 is connected to no other node (it is isolate after all),
 #    but all other nodes are connected.
 
-print(tyrosineHCl.order())
-print(tyrosineHCl.size())
-print(tyrosineHCl.mass())
-print(tyrosineHCl.exactMass())
-print(tyrosineHCl.formula())
-print(tyrosineHCl.isTerminal(0))
-print(tyrosineHCl.isTerminal(3))
-print(tyrosineHCl.isTerminal(4))
-print(tyrosineHCl.isTerminal(12))
-print(tyrosineHCl.isIsolate(13))
-print(tyrosineHCl.isIsolate(0))
-print(findPath(tyrosineHCl, 0, 12))
\ No newline at end of file
+if __name__ == '__main__':
+    molecule = tyrosineHCl()
+    print(molecule.order())
+    print(molecule.size())
+    print(molecule.mass())
+    print(molecule.exactMass())
+    print(molecule.formula())
+    print(molecule.isTerminal(0))
+    print(molecule.isTerminal(3))
+    print(molecule.isTerminal(4))
+    print(molecule.isTerminal(12))
+    print(molecule.isIsolate(13))
+    print(molecule.isIsolate(0))
+    print(findPath(molecule, 0, 12))
@@ -0,0 +1,177 @@
+'''
+Compact binary files of molecule collections with random access.
+
+A molecule file stores every molecule as a record of flat integer arrays
+(atom labels plus its bonds in compressed sparse row form, see
+`Molecule.toCsr`), followed by an index of record offsets. Files are
+memory mapped when read: opening a file only reads its header, and
+individual molecules are decoded on access straight from the mapping.
+Since the mapping is backed by the operating system's page cache, worker
+processes opening the same file share its memory.
+
+Layout (little endian):
+
+    header   8 bytes   magic `CHMOL\\0\\1\\0`
+             8 bytes   number of molecules (unsigned 64 bit)
+             8 bytes   offset of the index (unsigned 64 bit)
+             8 bytes   reserved
+    records  each starting at a multiple of 8:
+             4 bytes   number of atoms n (unsigned 32 bit)
+             4 bytes   number of bond entries e = 2 * bonds (unsigned 32 bit)
+             4(n+1)    indptr (unsigned 32 bit)
+             4e        indices (unsigned 32 bit)
+             n         elements (unsigned 8 bit)
+             n         hydrogens (unsigned 8 bit)
+             n         charges (signed 8 bit)
+             e         bond orders (unsigned 8 bit)
+    index    8 bytes per molecule: record offsets (unsigned 64 bit)
+
+Example:
+
+    writeMolecules('library.mol', molecules)
+    with MoleculeFile('library.mol') as library:
+        molecule = library[123456]
+'''
+import mmap
+import struct
+import sys
+from array import array
+
+from Molecule import Molecule
+
+MAGIC = b'CHMOL\0\1\0'
+HEADER = struct.Struct('<8sQQQ')
+
+
+def encode(molecule):
+    '''
+    Returns the record of a single molecule as bytes (without padding).
+    '''
+    elements, hydrogens, charges, indptr, indices, orders = molecule.toCsr()
+    parts = [struct.pack('<II', len(elements), len(indices)),
+             _littleEndian(array('I', indptr)), _littleEndian(array('I', indices)),
+             bytes(elements), bytes(hydrogens), array('b', charges).tobytes(), bytes(orders)]
+    return b''.join(parts)
+
+
+def _littleEndian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def writeMolecules(path, molecules):
+    '''
+    Writes the molecules of an iterable to a molecule file at `path`.
+    Molecules are written one at a time, so the iterable may be a generator.
+    Returns the number of molecules written.
+    '''
+    offsets = array('Q')
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, 0, 0, 0))
+        position = HEADER.size
+        for molecule in molecules:
+            record = encode(molecule)
+            record += bytes(-len(record) % 8)
+            offsets.append(position)
+            file.write(record)
+            position += len(record)
+        file.write(_littleEndian(offsets))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, len(offsets), position, 0))
+    return len(offsets)
+
+
+class MoleculeFile:
+    '''
+    This class gives random access to the molecules of a molecule file.
+
+    Attributes:
+    path (str): The path of the file.
+
+    Methods:
+    __len__(): Returns the number of molecules in the file.
+    __getitem__(index): Returns the molecule with the given index.
+    __iter__(): Iterates over all molecules in the file.
+    record(index): Returns the arrays of a molecule as zero-copy memoryviews.
+    close(): Closes the file.
+    '''
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError('Molecule files can only be mapped on little endian machines')
+        self.path = path
+        self._index = None
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, count, indexOffset, _ = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('Not a molecule file: ' + path)
+        self._count = count
+        self._index = self._view[indexOffset:indexOffset + 8 * count].cast('Q')
+
+    def __len__(self):
+        return self._count
+
+    def record(self, index):
+        '''
+        Returns the arrays (elements, hydrogens, charges, indptr, indices,
+        orders) of the molecule with the given index as memoryviews into the
+        mapped file, without copying.
+        '''
+        if self._map is None:
+            raise ValueError('I/O operation on closed molecule file')
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('Molecule index out of range')
+        view = self._view
+        offset = self._index[index]
+        n, e = struct.unpack_from('<II', view, offset)
+        offset += 8
+        indptr = view[offset:offset + 4 * (n + 1)].cast('I')
+        offset += 4 * (n + 1)
+        indices = view[offset:offset + 4 * e].cast('I')
+        offset += 4 * e
+        elements = view[offset:offset + n]
+        hydrogens = view[offset + n:offset + 2 * n]
+        charges = view[offset + 2 * n:offset + 3 * n].cast('b')
+        orders = view[offset + 3 * n:offset + 3 * n + e]
+        return elements, hydrogens, charges, indptr, indices, orders
+
+    def __getitem__(self, index):
+        return Molecule.fromCsr(*self.record(index))
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        '''
+        Closes the file. If memoryviews returned by `record` are still
+        alive, the mapping is only released once they are gone.
+        '''
+        if self._map is None:
+            return
+        try:
+            if self._index is not None:
+                self._index.release()
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            pass
+        self._index = self._view = self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # Worker processes map the file themselves instead of copying it.
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
@@ -0,0 +1,127 @@
+'''
+Ring perception: the smallest set of smallest rings (SSSR) of a molecule.
+
+The functions here are used through the ring methods of `Molecule`
+(`rings`, `isRingAtom`, `isRingBond`, `atomRings`), which cache their
+result, and are only imported when rings are first needed.
+
+Example:
+
+    rings, ringAtoms, ringBonds = perceiveRings(molecule)
+'''
+
+
+def perceiveRings(molecule):
+    '''
+    Returns a tuple (rings, ringAtoms, ringBonds) of the SSSR of the
+    molecule as a list of rings (tuples of atom indices in ring order,
+    starting at their lowest index, sorted by size), a dictionary mapping
+    ring atoms to the indices of their rings, and the set of ring bonds as
+    pairs (lower index, higher index).
+    '''
+    # Horton's algorithm: every cycle of a minimum cycle basis consists
+    # of an edge (x,y) plus the shortest paths from some root r to x and
+    # y. Using the paths of a BFS tree per root, these candidates are
+    # XORs of edge bitmasks. The shortest linearly independent ones
+    # (Gaussian elimination over GF(2)) form the SSSR.
+    # Atoms not in the 2-core (chains and substituents) cannot be part
+    # of a ring and are pruned first.
+    mol = molecule.mol
+    rings, ringAtoms, ringBonds = [], {}, set()
+    rank = molecule.cycleRank()
+    if rank == 0:
+        return rings, ringAtoms, ringBonds
+    degree = {node: len(neighbors) for node, (_, neighbors) in mol.items()}
+    stack = [node for node, d in degree.items() if d < 2]
+    while stack:
+        node = stack.pop()
+        if degree[node] < 0:
+            continue
+        degree[node] = -1
+        for neighbor in mol[node][1]:
+            if degree[neighbor] >= 0:
+                degree[neighbor] -= 1
+                if degree[neighbor] < 2:
+                    stack.append(neighbor)
+    core = {node: [neighbor for neighbor in mol[node][1] if degree[neighbor] >= 0]
+            for node, d in degree.items() if d >= 0}
+    bits, edges = {}, []
+    for node in sorted(core):
+        for neighbor in core[node]:
+            if node < neighbor:
+                bits[node, neighbor] = bits[neighbor, node] = 1 << len(edges)
+                edges.append((node, neighbor))
+
+    # Rings are usually small, so the BFS trees are first limited to a
+    # small depth. Candidates up to length 2*depth+1 are then complete,
+    # and only if they do not yield enough rings the depth is increased.
+    depth = 4
+    while True:
+        candidates = set()
+        for root in core:
+            paths = {root: 0}
+            lengths = {root: 0}
+            queue = [root]
+            for node in queue:
+                if lengths[node] == depth:
+                    continue
+                for neighbor in core[node]:
+                    if neighbor not in paths:
+                        paths[neighbor] = paths[node] | bits[node, neighbor]
+                        lengths[neighbor] = lengths[node] + 1
+                        queue.append(neighbor)
+            for x in queue:
+                for y in core[x]:
+                    if x < y and y in paths:
+                        cycle = paths[x] ^ paths[y] ^ bits[x, y]
+                        # Skip tree edges and paths sharing more than the root.
+                        if cycle and cycle.bit_count() == lengths[x] + lengths[y] + 1:
+                            candidates.add(cycle)
+
+        rings, basis = [], {}
+        for cycle in sorted(candidates, key=lambda cycle: (cycle.bit_count(), cycle)):
+            reduced = cycle
+            while reduced:
+                pivot = reduced.bit_length() - 1
+                if pivot not in basis:
+                    basis[pivot] = reduced
+                    rings.append(ringFromMask(cycle, edges))
+                    break
+                reduced ^= basis[pivot]
+            if len(rings) == rank:
+                break
+        if len(rings) == rank or depth >= len(core):
+            break
+        depth *= 2
+
+    for index, ring in enumerate(rings):
+        for position, node in enumerate(ring):
+            ringAtoms.setdefault(node, []).append(index)
+            neighbor = ring[position - 1]
+            ringBonds.add((min(node, neighbor), max(node, neighbor)))
+    return rings, ringAtoms, ringBonds
+
+
+def ringFromMask(mask, edges):
+    '''
+    Converts an edge bitmask of a simple cycle (bit i standing for
+    `edges[i]`) into its atoms in ring order, starting at the lowest index
+    towards its lower neighbor.
+    '''
+    neighbors = {}
+    index = 0
+    while mask:
+        if mask & 1:
+            x, y = edges[index]
+            neighbors.setdefault(x, []).append(y)
+            neighbors.setdefault(y, []).append(x)
+        mask >>= 1
+        index += 1
+    start = min(neighbors)
+    previous, node = start, min(neighbors[start])
+    ring = [start]
+    while node != start:
+        ring.append(node)
+        first, second = neighbors[node]
+        previous, node = node, (second if first == previous else first)
+    return tuple(ring)
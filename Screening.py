@@ -0,0 +1,238 @@
+'''
+Staged substructure screening of a query molecule against many targets.
+
+Full substructure matching is expensive, so targets are first run through
+cheap necessary conditions and only the survivors are matched:
+
+1. formula:  the formula of the target must contain the formula of the
+             query (`Formula.containsFormula`).
+2. degrees:  for every atom label (element, hydrogens, charge), the target
+             must have at least as many atoms with that label, and their
+             degrees, sorted in decreasing order, must each be at least as
+             large as those of the query.
+3. match:    full substructure matching (`findSubstructure`),
+             distributed over a pool of worker processes.
+
+Example:
+
+    result = screen(query, targets, workers=4)
+    print(result.hits)
+    print(result.summary())
+'''
+import itertools
+import time
+
+STAGES = ('formula', 'degrees', 'match')
+
+
+def degreeProfile(molecule):
+    '''
+    Returns a dictionary mapping the atom labels (element, hydrogens, charge)
+    of a molecule to the degrees of the atoms with that label, sorted in
+    decreasing order.
+    '''
+    profile = {}
+    for atom, neighbors in molecule.mol.values():
+        profile.setdefault((atom.element, atom.hydrogens, atom.charge), []).append(len(neighbors))
+    for degrees in profile.values():
+        degrees.sort(reverse=True)
+    return profile
+
+
+def findSubstructure(molecule, query):
+    '''
+    Searches for the molecule `query` as a substructure of `molecule`,
+    independent of how the atoms of either molecule are numbered.
+    Atoms match if they have the same element, number of implicit
+    hydrogens and charge; every bond of the query must be present in
+    `molecule` with the same bond order.
+    Returns a dictionary mapping the atoms of the query to atoms of
+    `molecule`, or None if there is no match.
+    '''
+    if query.order() > molecule.order():
+        return None
+    labels = {node: (atom.element, atom.hydrogens, atom.charge) for node, (atom, _) in molecule.mol.items()}
+    byLabel = {}
+    for node, label in labels.items():
+        byLabel.setdefault(label, []).append(node)
+    queryLabels = {node: (atom.element, atom.hydrogens, atom.charge) for node, (atom, _) in query.mol.items()}
+
+    # Match query atoms in BFS order, starting each component at its
+    # rarest, most connected atom, so that every further atom has an
+    # already matched neighbor restricting its candidates.
+    order, parent, seen = [], {}, set()
+    starts = sorted(query.mol, key=lambda node: (len(byLabel.get(queryLabels[node], ())),
+                                                 -query.degree(node)))
+    for start in starts:
+        if start in seen:
+            continue
+        seen.add(start)
+        parent[start] = None
+        queue = [start]
+        for node in queue:
+            order.append(node)
+            for neighbor in sorted(query.mol[node][1], key=lambda n: -query.degree(n)):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+
+    mapping, used = {}, set()
+
+    def candidates(node):
+        if parent[node] is None:
+            return iter(byLabel.get(queryLabels[node], ()))
+        return iter(molecule.mol[mapping[parent[node]]][1])
+
+    def feasible(node, target):
+        if target in used or labels[target] != queryLabels[node]:
+            return False
+        bonds = molecule.mol[target][1]
+        if len(bonds) < len(query.mol[node][1]):
+            return False
+        for neighbor, bond in query.mol[node][1].items():
+            if neighbor in mapping and bonds.get(mapping[neighbor]) != bond:
+                return False
+        return True
+
+    # Backtracking with an explicit stack of candidate iterators, one per
+    # matched query atom, so that large queries do not hit the recursion
+    # limit.
+    if not order:
+        return {}
+    stack = [candidates(order[0])]
+    while stack:
+        node = order[len(stack) - 1]
+        for target in stack[-1]:
+            if feasible(node, target):
+                mapping[node] = target
+                used.add(target)
+                break
+        else:
+            stack.pop()
+            if stack:
+                used.discard(mapping.pop(order[len(stack) - 1]))
+            continue
+        if len(stack) == len(order):
+            return dict(mapping)
+        stack.append(candidates(order[len(stack)]))
+    return None
+
+
+def dominates(profile, queryProfile):
+    '''
+    Returns True if the degree profile `profile` of a target can possibly
+    contain a query with degree profile `queryProfile`.
+    '''
+    for label, queryDegrees in queryProfile.items():
+        degrees = profile.get(label)
+        if degrees is None or len(degrees) < len(queryDegrees):
+            return False
+        for degree, queryDegree in zip(degrees, queryDegrees):
+            if degree < queryDegree:
+                return False
+    return True
+
+
+class ScreeningResult:
+    '''
+    This class holds the result of a screening run.
+
+    Attributes:
+    hits (list): The indices of the targets containing the query, in increasing order.
+    targets (int): The number of screened targets.
+    rejected (dict): The number of targets rejected per stage ('formula', 'degrees', 'match').
+    seconds (dict): The time spent per stage in seconds.
+    '''
+    def __init__(self):
+        self.hits = []
+        self.targets = 0
+        self.rejected = {stage: 0 for stage in STAGES}
+        self.seconds = {stage: 0.0 for stage in STAGES}
+
+    def throughput(self):
+        '''
+        Returns the number of targets screened per second.
+        '''
+        total = sum(self.seconds.values())
+        return self.targets / total if total else 0.0
+
+    def summary(self):
+        lines = ['%d targets, %d hits, %.0f targets/s' % (self.targets, len(self.hits), self.throughput())]
+        remaining = self.targets
+        for stage in STAGES:
+            lines.append('%-8s %8d in %8d rejected %8.3f s' % (stage, remaining, self.rejected[stage],
+                                                              self.seconds[stage]))
+            remaining -= self.rejected[stage]
+        return '\n'.join(lines)
+
+
+_query = None
+
+
+def _initWorker(query):
+    global _query
+    _query = query
+
+
+def _match(survivor):
+    index, target = survivor
+    return index, findSubstructure(target, _query) is not None
+
+
+def _survivors(query, targets, result):
+    # Generator yielding the targets (with their index) that pass the
+    # pre-filters, counting targets, rejections and time in `result`.
+    queryFormula = query.toFormula()
+    queryProfile = degreeProfile(query)
+    for index, target in enumerate(targets):
+        result.targets += 1
+        start = time.perf_counter()
+        if not target.toFormula().containsFormula(queryFormula):
+            result.rejected['formula'] += 1
+            result.seconds['formula'] += time.perf_counter() - start
+            continue
+        middle = time.perf_counter()
+        result.seconds['formula'] += middle - start
+        passed = dominates(degreeProfile(target), queryProfile)
+        result.seconds['degrees'] += time.perf_counter() - middle
+        if passed:
+            yield index, target
+        else:
+            result.rejected['degrees'] += 1
+
+
+def _record(result, matches):
+    for index, match in matches:
+        if match:
+            result.hits.append(index)
+        else:
+            result.rejected['match'] += 1
+
+
+def screen(query, targets, workers=1, chunkSize=256):
+    '''
+    Screens the molecules in `targets` (any iterable) for the substructure
+    `query`. The pre-filters run in the calling process; if `workers` is
+    greater than one, full matching is distributed over that many worker
+    processes in chunks of `chunkSize` targets. Survivors of the
+    pre-filters are streamed to the workers as they are found, so targets
+    are never held in memory all at once; the time of the 'match' stage is
+    then the time not spent in the pre-filters.
+    Returns a `ScreeningResult`.
+    '''
+    result = ScreeningResult()
+    survivors = _survivors(query, targets, result)
+    start = time.perf_counter()
+    # Only start worker processes if there is more than one chunk to match.
+    first = list(itertools.islice(survivors, chunkSize + 1)) if workers > 1 else []
+    survivors = itertools.chain(first, survivors)
+    if len(first) > chunkSize:
+        from multiprocessing import Pool
+        with Pool(workers, _initWorker, (query,)) as pool:
+            _record(result, pool.imap(_match, survivors, chunkSize))
+    else:
+        _record(result, ((index, findSubstructure(target, query) is not None) for index, target in survivors))
+    elapsed = time.perf_counter() - start
+    result.seconds['match'] = max(elapsed - result.seconds['formula'] - result.seconds['degrees'], 0.0)
+    return result
@@ -0,0 +1,285 @@
+'''
+Streaming top-k and quantile queries over properties of molecular formulae.
+
+Both summaries use bounded memory, no matter how many values they see, and
+summaries of separate chunks can be merged, so they work on generators
+over arbitrarily large files and across worker processes:
+
+* `TopK` keeps the k largest (or smallest) values with their formulae
+  in a heap.
+* `QuantileSketch` is a KLL sketch (Karnin, Lang, Liberty 2016) answering
+  approximate rank and quantile queries.
+
+Properties are the numeric columns of `FormulaTool` (mass, exactMass,
+atoms or an element symbol for its atom count). Lines that cannot be
+parsed are skipped and reported on standard error with their line
+numbers, or abort the run with `--errors fail`.
+
+Example:
+
+    python Sketches.py hs23_datalab_formulae.txt --property exactMass --top 100 --quantiles 0.5,0.99
+'''
+import argparse
+import heapq
+import json
+import random
+import sys
+from itertools import count
+
+from Formula import FormulaError
+from FormulaTool import chunks, columnType, processChunk, reportErrors
+
+
+class TopK:
+    '''
+    This class keeps the `k` largest (or, with `largest=False`, smallest)
+    values seen, each with an associated item (e.g. its formula).
+
+    Methods:
+    add(value, item): Offers a single value.
+    update(pairs): Offers (value, item) pairs from an iterable.
+    merge(other): Offers all values kept by another TopK object.
+    items(): Returns the kept (value, item) pairs, best first.
+    '''
+    def __init__(self, k, largest=True):
+        if k < 1:
+            raise ValueError('k must be positive')
+        self.k = k
+        self.largest = largest
+        self._heap = []
+        # Ties are broken by insertion order, so items are never compared.
+        self._counter = count()
+
+    def add(self, value, item=None):
+        key = value if self.largest else -value
+        entry = (key, -next(self._counter), value, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif key > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def update(self, pairs):
+        for value, item in pairs:
+            self.add(value, item)
+        return self
+
+    def merge(self, other):
+        if other.largest != self.largest:
+            raise ValueError('Cannot merge largest and smallest values')
+        for _, _, value, item in sorted(other._heap, reverse=True):
+            self.add(value, item)
+        return self
+
+    def items(self):
+        return [(value, item) for _, _, value, item in sorted(self._heap, reverse=True)]
+
+
+class QuantileSketch:
+    '''
+    This class implements a KLL sketch for approximate quantiles of a
+    stream of numbers. With the default `k` of 200, ranks are accurate to
+    about 1% of the number of values, using O(k) memory.
+
+    Methods:
+    add(value): Adds a single value.
+    update(values): Adds the values of an iterable.
+    merge(other): Adds all values summarized by another sketch.
+    rank(value): Returns the approximate number of values <= value.
+    quantile(q): Returns an approximate q-quantile (0 <= q <= 1).
+    '''
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(self.k * (2 / 3) ** depth) + 1
+
+    def _maxSize(self):
+        return sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self._size += 1
+        self.count += 1
+        if self._size >= self._maxSize():
+            self._compress()
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.count += other.count
+        self._size = sum(map(len, self.compactors))
+        while self._size >= self._maxSize():
+            self._compress()
+        return self
+
+    def _compress(self):
+        # Halves the first full compactor: every other of its sorted items
+        # moves one level up with twice the weight.
+        for height, items in enumerate(self.compactors):
+            if len(items) >= self._capacity(height):
+                if height + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                promoted = items[self._random.random() < 0.5::2]
+                self.compactors[height + 1].extend(promoted)
+                self._size += len(promoted) - len(items)
+                self.compactors[height] = []
+                if self._size < self._maxSize():
+                    return
+
+    def _weighted(self):
+        return sorted((value, 1 << height) for height, items in enumerate(self.compactors) for value in items)
+
+    def rank(self, value):
+        return sum(1 << height for height, items in enumerate(self.compactors) for item in items if item <= value)
+
+    def quantile(self, q):
+        '''
+        Returns a value whose rank is approximately q times the number of
+        values seen, or None if the sketch is empty.
+        '''
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        weighted = self._weighted()
+        if not weighted:
+            return [None] * len(qs)
+        total = sum(weight for _, weight in weighted)
+        result = []
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError('Quantiles must be between 0 and 1')
+            target, cumulative = q * total, 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            result.append(value)
+        return result
+
+
+def propertyValues(lines, name, chunkSize=10000, errors=None, start=1):
+    '''
+    Generator yielding (value, formula) pairs of the property `name` for
+    an iterable of formula lines. Empty lines are skipped.
+    Lines are numbered from `start`. If `errors` is a list, lines that
+    cannot be parsed are appended to it as tuples (lineNumber, reason) and
+    skipped; otherwise a FormulaError carrying the line number is raised.
+    '''
+    if columnType(name) is str:
+        raise ValueError('Not a numeric property: ' + name)
+    for chunk in chunks(lines, chunkSize):
+        for formula, value in processChunk(chunk, ('formula', name), errors, start):
+            yield value, formula
+        start += len(chunk)
+
+
+def _summarizeChunk(args):
+    lines, name, k, seed, start, skip = args
+    errors = [] if skip else None
+    largest, smallest, sketch = TopK(k), TopK(k, largest=False), QuantileSketch(seed=seed)
+    for value, formula in propertyValues(lines, name, len(lines), errors, start):
+        largest.add(value, formula)
+        smallest.add(value, formula)
+        sketch.add(value)
+    return (largest, smallest, sketch), errors
+
+
+def summarizeLines(lines, name, k=10, chunkSize=100000, workers=1, seed=None, errors=None):
+    '''
+    Streams an iterable of formula lines and returns a tuple (largest,
+    smallest, sketch) of two `TopK` objects and a `QuantileSketch` for the
+    property `name`. Chunks of `chunkSize` lines are summarized by
+    `workers` processes and merged.
+    If `errors` is a list, lines that cannot be parsed are skipped and
+    appended to it as tuples (lineNumber, reason), in line order;
+    otherwise a FormulaError is raised.
+    '''
+    if columnType(name) is str:
+        raise ValueError('Not a numeric property: ' + name)
+    if chunkSize < 1:
+        raise ValueError('chunkSize must be positive')
+    skip = errors is not None
+    tasks = ((chunk, name, k, None if seed is None else seed + index, 1 + index * chunkSize, skip)
+             for index, chunk in enumerate(chunks(lines, chunkSize)))
+    result = TopK(k), TopK(k, largest=False), QuantileSketch(seed=seed)
+    if workers <= 1:
+        summaries = map(_summarizeChunk, tasks)
+        for summary, failed in summaries:
+            for total, part in zip(result, summary):
+                total.merge(part)
+            if skip:
+                errors.extend(failed)
+        return result
+    from multiprocessing import Pool
+    with Pool(workers) as pool:
+        for summary, failed in pool.imap_unordered(_summarizeChunk, tasks):
+            for total, part in zip(result, summary):
+                total.merge(part)
+            if skip:
+                errors.extend(failed)
+    if skip:
+        errors.sort()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Top-k values and quantiles of a formula property.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with one formula per line (default: standard input)')
+    parser.add_argument('-p', '--property', default='mass',
+                        help='mass, exactMass, atoms or an element symbol (default: mass)')
+    parser.add_argument('-k', '--top', type=int, default=10,
+                        help='number of largest and smallest values to report (default: 10)')
+    parser.add_argument('-q', '--quantiles', default='0.01,0.25,0.5,0.75,0.99',
+                        help='comma separated quantiles (default: 0.01,0.25,0.5,0.75,0.99)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='number of lines per chunk (default: 100000)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed of the sketch')
+    parser.add_argument('--errors', choices=('skip', 'fail'), default='skip',
+                        help='skip and report unparsable lines, or stop at the first (default: skip)')
+    args = parser.parse_args(argv)
+    try:
+        qs = [float(q) for q in args.quantiles.split(',') if q.strip()]
+        if columnType(args.property) is str or args.top < 1:
+            raise ValueError('Not a numeric property: ' + args.property)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+    errors = [] if args.errors == 'skip' else None
+    source = sys.stdin if args.input == '-' else open(args.input, 'r')
+    try:
+        largest, smallest, sketch = summarizeLines(source, args.property, args.top,
+                                                   args.chunk_size, args.workers, args.seed, errors)
+    except FormulaError as error:
+        sys.stderr.write('%s\n' % error)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if errors:
+        reportErrors(errors)
+    json.dump({'property': args.property, 'count': sketch.count,
+               'largest': largest.items(), 'smallest': smallest.items(),
+               'quantiles': dict(zip(map(str, qs), sketch.quantiles(qs)))}, sys.stdout)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+'''
+Distributions over large collections of molecular formulae.
+
+`FormulaStatistics` collects, in a single pass over the formulae,
+
+* per element histograms of atom counts,
+* a histogram of molar masses with configurable binning, and
+* an element co-occurrence matrix (number of formulae containing both
+  elements of a pair).
+
+Statistics of separate chunks can be merged, so large files can be
+processed in parallel or incrementally. Within a chunk, every distinct
+formula is parsed only once and weighted by its number of occurrences.
+
+Example:
+
+    python Statistics.py hs23_datalab_formulae.txt --bin-width 10 --workers 4
+
+Lines that cannot be parsed are skipped and reported on standard error
+with their line numbers, or abort the run with `--errors fail`.
+'''
+import argparse
+import json
+import math
+import sys
+from collections import Counter
+
+from Elements import masses, symbols
+from Formula import Formula, FormulaError, atomicNumber, parseFormula
+from FormulaTool import chunks, reportErrors
+
+
+class FormulaStatistics:
+    '''
+    This class accumulates distributions over molecular formulae.
+
+    Attributes:
+    formulas (int): The number of formulae seen.
+    binWidth (float): The width of the bins of the mass histogram.
+    origin (float): The lower bound of bin 0 of the mass histogram.
+    elementCounts (dict): Maps atomic numbers to dictionaries mapping atom counts (> 0) to frequencies.
+    massBins (dict): Maps bin indices to frequencies.
+    pairs (dict): Maps pairs (a, b) of atomic numbers with a <= b to the number of formulae containing both.
+
+    Methods:
+    update(formulas): Adds formulae (strings, dictionaries or Formula objects) to the statistics.
+    merge(other): Adds the statistics of another FormulaStatistics object.
+    elementHistogram(element): Returns the histogram of atom counts of an element.
+    massHistogram(): Returns the histogram of masses.
+    cooccurrence(): Returns the element co-occurrence matrix.
+    toDict(): Returns all statistics as a JSON serializable dictionary.
+    '''
+    def __init__(self, binWidth=10.0, origin=0.0):
+        if binWidth <= 0:
+            raise ValueError('binWidth must be positive')
+        self.formulas = 0
+        self.binWidth = binWidth
+        self.origin = origin
+        self.elementCounts = {}
+        self.massBins = {}
+        self.pairs = {}
+
+    def update(self, formulas, errors=None, start=1):
+        '''
+        Adds the given formulae to the statistics and returns self.
+        Formulae can be strings, dictionaries mapping atomic numbers to
+        counts or `Formula` objects. Empty strings are skipped.
+        Formulae are numbered from `start`. If `errors` is a list, strings
+        that cannot be parsed are appended to it as tuples (number, reason)
+        and skipped; otherwise a FormulaError carrying the number is raised.
+        '''
+        weights = Counter()
+        parsed = {}
+        for number, formula in enumerate(formulas, start):
+            if isinstance(formula, str):
+                string = formula.strip()
+                if not string:
+                    continue
+                result = parsed.get(string)
+                if result is None:
+                    try:
+                        result = parseFormula(string)
+                    except FormulaError as error:
+                        if errors is None:
+                            raise FormulaError(error.string, error.position, error.reason, number) from None
+                        result = error
+                    parsed[string] = result
+                if isinstance(result, FormulaError):
+                    errors.append((number, '%s at position %d' % (result.reason, result.position)))
+                else:
+                    weights[string] += 1
+            elif isinstance(formula, Formula):
+                self.add(formula.get_formula())
+            else:
+                self.add(formula)
+        for string, weight in weights.items():
+            self.add(parsed[string], weight)
+        return self
+
+    def add(self, formula, weight=1):
+        '''
+        Adds a single formula (a dictionary mapping atomic numbers to
+        counts), counted `weight` times.
+        '''
+        elementCounts, pairs = self.elementCounts, self.pairs
+        present = sorted(number for number, count in formula.items() if count > 0)
+        mass = 0.0
+        for number in present:
+            count = formula[number]
+            mass += masses[number] * count
+            histogram = elementCounts.get(number)
+            if histogram is None:
+                histogram = elementCounts[number] = {}
+            histogram[count] = histogram.get(count, 0) + weight
+        for i, a in enumerate(present):
+            for b in present[i:]:
+                pairs[a, b] = pairs.get((a, b), 0) + weight
+        index = math.floor((mass - self.origin) / self.binWidth)
+        self.massBins[index] = self.massBins.get(index, 0) + weight
+        self.formulas += weight
+
+    def merge(self, other):
+        '''
+        Adds the statistics of `other` to this object and returns self.
+        Raises a ValueError if the mass histograms use different bins.
+        '''
+        if other.binWidth != self.binWidth or other.origin != self.origin:
+            raise ValueError('Cannot merge statistics with different mass bins')
+        self.formulas += other.formulas
+        for number, histogram in other.elementCounts.items():
+            target = self.elementCounts.setdefault(number, {})
+            for count, frequency in histogram.items():
+                target[count] = target.get(count, 0) + frequency
+        for index, frequency in other.massBins.items():
+            self.massBins[index] = self.massBins.get(index, 0) + frequency
+        for pair, frequency in other.pairs.items():
+            self.pairs[pair] = self.pairs.get(pair, 0) + frequency
+        return self
+
+    def elementHistogram(self, element):
+        '''
+        Returns the histogram of atom counts of the given element (symbol or
+        atomic number) as a list of frequencies, where entry i is the number
+        of formulae with exactly i atoms of the element.
+        '''
+        histogram = self.elementCounts.get(atomicNumber(element), {})
+        result = [0] * (max(histogram, default=0) + 1)
+        for count, frequency in histogram.items():
+            result[count] = frequency
+        result[0] = self.formulas - sum(histogram.values())
+        return result
+
+    def massHistogram(self):
+        '''
+        Returns the histogram of masses as a list of (lower bound, frequency)
+        pairs for all bins between the lightest and the heaviest formula.
+        '''
+        if not self.massBins:
+            return []
+        return [(self.origin + index * self.binWidth, self.massBins.get(index, 0))
+                for index in range(min(self.massBins), max(self.massBins) + 1)]
+
+    def cooccurrence(self):
+        '''
+        Returns a tuple (elements, matrix), where `elements` is the sorted
+        list of symbols of all elements seen and `matrix[i][j]` is the number
+        of formulae containing both elements i and j. The diagonal holds the
+        number of formulae containing each element.
+        '''
+        numbers = sorted(self.elementCounts)
+        position = {number: index for index, number in enumerate(numbers)}
+        matrix = [[0] * len(numbers) for _ in numbers]
+        for (a, b), frequency in self.pairs.items():
+            matrix[position[a]][position[b]] = matrix[position[b]][position[a]] = frequency
+        return [symbols[number] for number in numbers], matrix
+
+    def toDict(self):
+        elements, matrix = self.cooccurrence()
+        return {'formulas': self.formulas,
+                'elements': {symbols[number]: self.elementHistogram(number) for number in sorted(self.elementCounts)},
+                'mass': {'binWidth': self.binWidth, 'origin': self.origin, 'histogram': self.massHistogram()},
+                'cooccurrence': {'elements': elements, 'matrix': matrix}}
+
+
+def _chunkStatistics(args):
+    lines, binWidth, origin, start, skip = args
+    errors = [] if skip else None
+    return FormulaStatistics(binWidth, origin).update(lines, errors, start), errors
+
+
+def statisticsFromLines(lines, binWidth=10.0, origin=0.0, chunkSize=100000, workers=1, errors=None):
+    '''
+    Computes the statistics of an iterable of formula lines (e.g. an open
+    file) in chunks of `chunkSize` lines, using `workers` processes.
+    Returns a `FormulaStatistics` object.
+    If `errors` is a list, lines that cannot be parsed are skipped and
+    appended to it as tuples (lineNumber, reason), in line order;
+    otherwise a FormulaError is raised.
+    '''
+    if chunkSize < 1:
+        raise ValueError('chunkSize must be positive')
+    result = FormulaStatistics(binWidth, origin)
+    skip = errors is not None
+    tasks = ((chunk, binWidth, origin, 1 + index * chunkSize, skip)
+             for index, chunk in enumerate(chunks(lines, chunkSize)))
+    if workers <= 1:
+        summaries = map(_chunkStatistics, tasks)
+        for statistics, failed in summaries:
+            result.merge(statistics)
+            if skip:
+                errors.extend(failed)
+        return result
+    from multiprocessing import Pool
+    with Pool(workers) as pool:
+        for statistics, failed in pool.imap_unordered(_chunkStatistics, tasks):
+            result.merge(statistics)
+            if skip:
+                errors.extend(failed)
+    if skip:
+        errors.sort()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute distributions over a file of molecular formulae.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with one formula per line (default: standard input)')
+    parser.add_argument('--bin-width', type=float, default=10.0,
+                        help='width of the mass histogram bins (default: 10)')
+    parser.add_argument('--origin', type=float, default=0.0,
+                        help='lower bound of the first mass bin (default: 0)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='number of lines per chunk (default: 100000)')
+    parser.add_argument('--errors', choices=('skip', 'fail'), default='skip',
+                        help='skip and report unparsable lines, or stop at the first (default: skip)')
+    args = parser.parse_args(argv)
+    if args.bin_width <= 0:
+        parser.error('--bin-width must be positive')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+    errors = [] if args.errors == 'skip' else None
+    source = sys.stdin if args.input == '-' else open(args.input, 'r')
+    try:
+        statistics = statisticsFromLines(source, args.bin_width, args.origin, args.chunk_size,
+                                         args.workers, errors)
+    except FormulaError as error:
+        sys.stderr.write('%s\n' % error)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if errors:
+        reportErrors(errors)
+    json.dump(statistics.toDict(), sys.stdout)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,22 @@
+import os
+import sys
 from Formula import Formula
 '''
 This a testing file for the Formula class.
 It reads a file with formulas and calculates the heaviest, lightest, most atoms, least atoms, average mass and average number of C-atoms.
 It prints the formula and the mass of said formulas.
-To run the test file please update the file path to the correct path on your computer.
+By default it reads hs23_datalab_formulae.txt next to this file, another file can be given as argument.
+For bulk processing of large files use FormulaTool.py instead.
 '''
 
-file_path = r"C:\Daten\ChemInfo\datalab23\Exercises\hs23_datalab_formulae.txt"
+if len(sys.argv) > 1:
+    file_path = sys.argv[1]
+else:
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hs23_datalab_formulae.txt")
 with open(file_path, "r") as file:
     f = file.read()
 
-molecules = f.split('\n')
+molecules = f.split()
 
 # find the heaviest molecule and print the mass and the formula
 heaviest = Formula(molecules[0])
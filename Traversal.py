@@ -0,0 +1,84 @@
+'''
+Traversal of molecules: breadth and depth first search, neighborhoods of
+atoms and induced subgraphs.
+
+The functions here are used through `Molecule.bfs`, `Molecule.dfs`,
+`Molecule.neighborhood` and `Molecule.subgraph` and are only imported
+when first needed.
+
+Example:
+
+    for node, depth in bfs(molecule, 0, maxDepth=2):
+        print(node, depth)
+'''
+from Molecule import Molecule
+
+
+def bfs(molecule, start, maxDepth=None):
+    '''
+    Generator yielding tuples (node, depth) of the atoms reachable from
+    `start` in breadth first order, where depth is the distance to
+    `start`. With `maxDepth`, atoms further away are not visited.
+    '''
+    mol = molecule.mol
+    depths = {start: 0}
+    queue = [start]
+    for node in queue:
+        depth = depths[node]
+        yield node, depth
+        if depth == maxDepth:
+            continue
+        for neighbor in mol[node][1]:
+            if neighbor not in depths:
+                depths[neighbor] = depth + 1
+                queue.append(neighbor)
+
+
+def dfs(molecule, start, maxDepth=None):
+    '''
+    Generator yielding tuples (node, depth) of the atoms reachable from
+    `start` in depth first preorder, where depth is the depth in the
+    search tree (not necessarily the distance to `start`). With
+    `maxDepth`, the search does not go deeper.
+    '''
+    mol = molecule.mol
+    seen = set()
+    stack = [(start, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        yield node, depth
+        if depth != maxDepth:
+            stack.extend((neighbor, depth + 1) for neighbor in reversed(list(mol[node][1]))
+                         if neighbor not in seen)
+
+
+def neighborhood(molecule, node, k):
+    '''
+    Returns the sorted atom indices within `k` bonds of the given atom,
+    including the atom itself.
+    '''
+    return sorted(neighbor for neighbor, _ in bfs(molecule, node, k))
+
+
+def subgraph(molecule, nodes):
+    '''
+    Returns the molecule induced by the given atom indices: atom i of
+    the new molecule is atom nodes[i] of the given one, and all bonds
+    between the given atoms are kept. Atom objects are shared, not copied.
+    '''
+    mol = molecule.mol
+    nodes = list(nodes)
+    position = {node: index for index, node in enumerate(nodes)}
+    if len(position) != len(nodes):
+        raise ValueError('Duplicate atom index in subgraph')
+    result = Molecule([mol[node][0] for node in nodes], [])
+    result.mol = {index: (mol[node][0], {position[neighbor]: bond
+                                         for neighbor, bond in mol[node][1].items()
+                                         if neighbor in position})
+                  for index, node in enumerate(nodes)}
+    result.edges = [(index, neighbor, bond) for index, (_, neighbors) in result.mol.items()
+                    for neighbor, bond in neighbors.items() if index < neighbor]
+    return result
@@ -0,0 +1,118 @@
+'''
+Tests for `Formula`. Run with `python -m pytest` or `python test_Formula.py`.
+'''
+import unittest
+
+from Elements import fromSymbol
+from Formula import Formula, FormulaError, counter, parseFormula, parseFormulas, parseIon, printFormula
+
+
+def counts(**elements):
+    # Maps element symbols to counts by atomic number, e.g. counts(C=1, H=4).
+    return {fromSymbol[symbol]: count for symbol, count in elements.items()}
+
+
+class ParseTest(unittest.TestCase):
+    def testPlain(self):
+        self.assertEqual(parseFormula('CH3CH2OH'), counts(C=2, H=6, O=1))
+        self.assertEqual(parseFormula('C12H22O11'), counts(C=12, H=22, O=11))
+
+    def testTrailingDigits(self):
+        # The count at the very end of the string used to be dropped.
+        self.assertEqual(counter(1, 'C12'), (3, 12))
+        self.assertEqual(parseFormula('CH4'), counts(C=1, H=4))
+        self.assertEqual(parseFormula('(CH2)12'), counts(C=12, H=24))
+
+    def testZeroCounts(self):
+        # C0 used to count as one carbon.
+        self.assertEqual(parseFormula('C0'), {})
+        self.assertEqual(parseFormula('C0H4'), counts(H=4))
+        self.assertEqual(parseFormula('C0H4+'), counts(H=4))
+
+    def testGroups(self):
+        self.assertEqual(parseFormula('Ca(OH)2'), counts(Ca=1, O=2, H=2))
+        self.assertEqual(parseFormula('[Cu(NH3)4]SO4'), counts(Cu=1, N=4, H=12, S=1, O=4))
+
+    def testHydrates(self):
+        expected = counts(Cu=1, S=1, O=9, H=10)
+        for string in ('CuSO4·5H2O', 'CuSO4.5H2O', 'CuSO4*5H2O', 'CuSO4•5H2O'):
+            self.assertEqual(parseFormula(string), expected)
+        self.assertEqual(parseFormula('2H2O'), counts(H=4, O=2))
+
+
+class ChargeTest(unittest.TestCase):
+    def testForms(self):
+        cases = {'NH4+': (counts(N=1, H=4), 1), 'OH-': (counts(O=1, H=1), -1),
+                 'SO4-2': (counts(S=1, O=4), -2), 'SO4^2-': (counts(S=1, O=4), -2),
+                 'Fe+3': (counts(Fe=1), 3), 'Fe^3+': (counts(Fe=1), 3), 'O--': (counts(O=1), -2),
+                 'Fe2^+': (counts(Fe=2), 1), 'CH4': (counts(C=1, H=4), 0)}
+        for string, expected in cases.items():
+            self.assertEqual(parseIon(string), expected, string)
+
+    def testAmbiguousIonNotation(self):
+        # Fe3+ reads as Fe3 with charge +1, which is rarely meant.
+        with self.assertRaises(FormulaError) as context:
+            parseIon('Fe3+')
+        self.assertEqual(context.exception.position, 3)
+        self.assertIn('Fe^3+', context.exception.reason)
+        self.assertEqual(parseIon('Fe3+', strict=False), (counts(Fe=3), 1))
+
+    def testFormulaKeepsCharge(self):
+        formula = Formula('SO4^2-')
+        self.assertEqual(formula.charge, -2)
+        self.assertEqual(str(formula), 'O4S-2')
+        for string in ('NH4+', 'Fe^2+', 'Fe2^+', 'O2^-'):
+            self.assertEqual(Formula(str(Formula(string))), Formula(string), string)
+        self.assertNotEqual(Formula('NH4+'), Formula('NH4'))
+        self.assertEqual(printFormula(counts(Fe=2), 1), 'Fe2^+')
+
+
+class ErrorTest(unittest.TestCase):
+    def assertError(self, string, position, reason):
+        with self.assertRaises(FormulaError) as context:
+            parseFormula(string)
+        self.assertEqual((context.exception.position, context.exception.reason), (position, reason))
+
+    def testStrict(self):
+        self.assertError('', 0, 'Empty formula')
+        self.assertError('H2O.', 4, 'Missing element')
+        self.assertError('Xy2', 0, "Unknown element 'Xy'")
+        self.assertError('C(', 1, "Unclosed '('")
+        self.assertError('C)', 1, "Unmatched ')'")
+        self.assertError('C()', 2, 'Empty group')
+        self.assertError('H2O+x', 3, 'Invalid charge')
+        self.assertError('H2O!', 3, "Unexpected character '!'")
+
+    def testLenient(self):
+        cases = {'': {}, 'H2O.': counts(H=2, O=1), 'Xy2CH4': counts(C=1, H=4),
+                 'C(': counts(C=1), 'C)': counts(C=1), 'H2O!': counts(H=2, O=1)}
+        for string, expected in cases.items():
+            self.assertEqual(parseFormula(string, strict=False), expected, string)
+
+    def testBulk(self):
+        lines = ['CH4\n', '\n', 'Xy2\n', 'H2O\n']
+        errors = []
+        self.assertEqual(list(parseFormulas(lines, errors=errors)), [(1, counts(C=1, H=4)), (4, counts(H=2, O=1))])
+        self.assertEqual(errors, [(3, "Unknown element 'Xy' at position 0")])
+        with self.assertRaises(FormulaError) as context:
+            list(parseFormulas(lines))
+        self.assertEqual(context.exception.line, 3)
+
+
+class ArithmeticTest(unittest.TestCase):
+    def testSubtract(self):
+        self.assertEqual(Formula('C2H6O') - Formula('H2O'), Formula('C2H4'))
+        self.assertEqual((Formula('NH4+') - Formula('H+')).charge, 0)
+        with self.assertRaises(ValueError):
+            Formula('CH4') - Formula('O')
+        with self.assertRaises(ValueError):
+            Formula('CH4') - Formula('C2')
+
+    def testAddFormula(self):
+        formula = Formula('NH3')
+        formula.addFormula('H+')
+        self.assertEqual(formula, Formula('NH4+'))
+
+
+if __name__ == '__main__':
+    unittest.main()
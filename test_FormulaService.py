@@ -0,0 +1,29 @@
+'''
+Tests for `FormulaService`. Run with `python -m pytest` or `python test_FormulaService.py`.
+'''
+import unittest
+
+from FormulaService import processBatch
+
+
+class ProcessBatchTest(unittest.TestCase):
+    def testOperations(self):
+        results = processBatch([{'op': 'parse', 'formula': 'CH3CH2OH'},
+                                {'op': 'contains', 'formula': 'C2H6O', 'query': {'C': 1, '8': 1}},
+                                {'op': 'contains', 'formula': 'C2H6O', 'query': 'N'}])
+        self.assertEqual(results, [(True, {'hill': 'C2H6O', 'counts': {'C': 2, 'H': 6, 'O': 1}}),
+                                   (True, True), (True, False)])
+
+    def testInvalidRequests(self):
+        requests = [{'op': 'parse', 'formula': {'a': 1}}, {'op': 'mass'}, {'op': 'parse', 'formula': 'Xy'},
+                    {'op': 'split', 'formula': 'CH4'}, {'op': 'contains', 'formula': 'CH4', 'query': 1}]
+        results = processBatch(requests)
+        self.assertEqual([result[1] for result in results[:2]], ['ValueError: Formula must be a string'] * 2)
+        self.assertTrue(results[2][1].startswith('FormulaError: '))
+        self.assertEqual(results[3], (False, 'ValueError: Unknown operation: split'))
+        self.assertEqual(results[4], (False, 'ValueError: Query must be a formula string or an object of element counts'))
+        self.assertEqual(processBatch([{'op': 'mass', 'formula': 'CH4'}])[0][0], True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+'''
+Tests for `Fragmentation`. Run with `python -m pytest` or `python test_Fragmentation.py`.
+'''
+import random
+import unittest
+
+from Atom import Atom
+from Fragmentation import cleavages, fragmentMolecule
+from Molecule import Molecule, tyrosineHCl
+
+
+def randomMolecule(rng):
+    # A small random molecule with rings, bridges and several components.
+    count = rng.randint(1, 11)
+    bonds = set()
+    for node in range(1, count):
+        if rng.random() < 0.85:
+            parent = rng.randrange(node)
+            bonds.add((parent, node))
+    for _ in range(rng.randint(0, count)):
+        a, b = rng.randrange(count), rng.randrange(count)
+        if a != b:
+            bonds.add((min(a, b), max(a, b)))
+    atoms = [Atom(rng.choice('CCCNO'), rng.randint(0, 2)) for _ in range(count)]
+    return Molecule(atoms, [(a, b, 1) for a, b in sorted(bonds)])
+
+
+def pieces(molecule, broken):
+    # Returns the components of the molecule without the given bonds.
+    seen, result = set(), []
+    for start in molecule.mol:
+        if start in seen:
+            continue
+        seen.add(start)
+        piece = [start]
+        for node in piece:
+            for neighbor in molecule.mol[node][1]:
+                if neighbor not in seen and (min(node, neighbor), max(node, neighbor)) not in broken:
+                    seen.add(neighbor)
+                    piece.append(neighbor)
+        result.append(piece)
+    return result
+
+
+def counts(molecule, piece):
+    formula = {}
+    for node in piece:
+        atom = molecule.mol[node][0]
+        formula[atom.element] = formula.get(atom.element, 0) + 1
+        if atom.hydrogens:
+            formula[1] = formula.get(1, 0) + atom.hydrogens
+    return tuple(sorted(formula.items()))
+
+
+def bruteForce(molecule):
+    # Every bond, and every pair of bonds in one component, whose removal
+    # splits that component, skipping pairs of a bridge and a ring bond.
+    bonds = sorted((min(a, b), max(a, b)) for a, b, _ in molecule.edges)
+    before = len(pieces(molecule, set()))
+    component = {node: index for index, piece in enumerate(pieces(molecule, set())) for node in piece}
+    bridges = {bond for bond in bonds if len(pieces(molecule, {bond})) > before}
+    expected = set()
+    for i, first in enumerate(bonds):
+        cuts = [(first,)] + [(first, second) for second in bonds[i + 1:]
+                             if component[first[0]] == component[second[0]]]
+        for cut in cuts:
+            if len(cut) == 2 and (cut[0] in bridges) != (cut[1] in bridges):
+                continue
+            after = pieces(molecule, set(cut))
+            if len(after) == before:
+                continue
+            split = [piece for piece in after if component[piece[0]] == component[cut[0][0]]]
+            expected.add((frozenset(cut), tuple(sorted(counts(molecule, piece) for piece in split))))
+    return expected
+
+
+def engine(molecule):
+    return {(frozenset(bonds), tuple(sorted(tuple(sorted(fragment.items())) for fragment in fragments)))
+            for bonds, fragments in cleavages(molecule)}
+
+
+class CleavageTest(unittest.TestCase):
+    def testAgainstBruteForce(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            molecule = randomMolecule(rng)
+            self.assertEqual(engine(molecule), bruteForce(molecule), molecule.edges)
+
+    def testTyrosineHCl(self):
+        self.assertEqual(engine(tyrosineHCl()), bruteForce(tyrosineHCl()))
+
+    def testEthane(self):
+        ethane = Molecule([Atom('C', 3), Atom('C', 3)], [(0, 1, 1)])
+        fragments = fragmentMolecule(ethane)
+        self.assertEqual([(fragment.formula, fragment.cleavages) for fragment in fragments], [('CH3', [((0, 1),)])])
+
+
+if __name__ == '__main__':
+    unittest.main()
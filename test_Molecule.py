@@ -0,0 +1,218 @@
+'''
+Tests for `Molecule`. Run with `python -m pytest` or `python test_Molecule.py`.
+'''
+import random
+import time
+import unittest
+
+from Atom import Atom
+from Molecule import Molecule, topologicalDescriptors, tyrosineHCl, uniqueMolecules
+
+
+def permuted(molecule, rng):
+    '''
+    Returns a copy of the molecule with randomly renumbered atoms.
+    '''
+    count = molecule.order()
+    permutation = list(range(count))
+    rng.shuffle(permutation)
+    atoms = [None] * count
+    for old, new in enumerate(permutation):
+        atoms[new] = molecule.mol[old][0]
+    return Molecule(atoms, [(permutation[a], permutation[b], bond) for a, b, bond in molecule.edges])
+
+
+def ring(size, offset=0):
+    return [(offset + i, offset + (i + 1) % size, 1) for i in range(size)]
+
+
+def branchedTree(levels, branches):
+    # A tree of carbons in which every inner atom has `branches` children.
+    atoms, edges, frontier = [Atom('C')], [], [0]
+    for _ in range(levels):
+        children = []
+        for parent in frontier:
+            for _ in range(branches):
+                atoms.append(Atom('C'))
+                edges.append((parent, len(atoms) - 1, 1))
+                children.append(len(atoms) - 1)
+        frontier = children
+    return Molecule(atoms, edges)
+
+
+class CanonicalStringTest(unittest.TestCase):
+    def assertInvariant(self, molecule, runs=50):
+        rng = random.Random(0)
+        expected = molecule.canonicalString()
+        for _ in range(runs):
+            self.assertEqual(permuted(molecule, rng).canonicalString(), expected)
+
+    def testTyrosineHCl(self):
+        self.assertInvariant(tyrosineHCl())
+
+    def testRingsOfEqualAtoms(self):
+        # Refinement cannot tell the atoms of these rings apart, although
+        # they are not all symmetric to each other.
+        atoms = [Atom('C', 2) for _ in range(12)]
+        self.assertInvariant(Molecule(atoms, ring(6) + ring(3, 6) + ring(3, 9)))
+
+    def testCubicGraphs(self):
+        petersen = ring(5) + [(i, i + 5, 1) for i in range(5)] + [(5 + i, 5 + (i + 2) % 5, 1) for i in range(5)]
+        prism = ring(5) + ring(5, 5) + [(i, i + 5, 1) for i in range(5)]
+        for edges in (petersen, prism):
+            self.assertInvariant(Molecule([Atom('C') for _ in range(10)], edges))
+
+    def testSymmetricMoleculesAreFast(self):
+        # Without pruning by automorphisms, the search grows exponentially
+        # with the symmetry of these molecules.
+        hypercube = [(i, i ^ bit, 1) for i in range(64) for bit in (1, 2, 4, 8, 16, 32) if i < i ^ bit]
+        for molecule in (branchedTree(3, 3), branchedTree(5, 2),
+                         Molecule([Atom('C') for _ in range(64)], hypercube)):
+            start = time.perf_counter()
+            self.assertInvariant(molecule, runs=3)
+            self.assertLess(time.perf_counter() - start, 5)
+
+    def testDifferentMolecules(self):
+        atoms = [Atom('C', 2) for _ in range(12)]
+        twoRings = Molecule(atoms, ring(6) + ring(6, 6))
+        threeRings = Molecule(atoms, ring(6) + ring(3, 6) + ring(3, 9))
+        self.assertNotEqual(twoRings.canonicalString(), threeRings.canonicalString())
+
+    def testUniqueMolecules(self):
+        rng = random.Random(1)
+        molecules = [permuted(tyrosineHCl(), rng) for _ in range(20)]
+        self.assertEqual(len(list(uniqueMolecules(molecules))), 1)
+
+
+def cycleBasisSizes(molecule):
+    # The sizes of a minimum cycle basis, by brute force: all simple cycles
+    # as bond bitmasks, shortest first, kept if independent over GF(2).
+    bits = {}
+    for a, b, _ in molecule.edges:
+        bits[a, b] = bits[b, a] = 1 << len(bits) // 2
+    cycles = set()
+
+    def extend(start, path, mask):
+        for neighbor in molecule.mol[path[-1]][1]:
+            if neighbor == start and len(path) > 2:
+                cycles.add(mask | bits[path[-1], start])
+            elif neighbor > start and neighbor not in path:
+                extend(start, path + [neighbor], mask | bits[path[-1], neighbor])
+
+    for start in molecule.mol:
+        extend(start, [start], 0)
+    basis, sizes = {}, []
+    for cycle in sorted(cycles, key=lambda cycle: (bin(cycle).count('1'), cycle)):
+        reduced = cycle
+        while reduced:
+            pivot = reduced.bit_length() - 1
+            if pivot not in basis:
+                basis[pivot] = reduced
+                sizes.append(bin(cycle).count('1'))
+                break
+            reduced ^= basis[pivot]
+    return sorted(sizes)
+
+
+class RingTest(unittest.TestCase):
+    def assertRings(self, molecule, sizes):
+        rings = molecule.rings()
+        self.assertEqual(sorted(map(len, rings)), sizes)
+        self.assertEqual(molecule.ringCount(), len(sizes))
+        for ring in rings:
+            for index, node in enumerate(ring):
+                self.assertIn(ring[index - 1], molecule.mol[node][1])
+            self.assertEqual(len(set(ring)), len(ring))
+
+    def testKnownSystems(self):
+        naphthalene = ring(10) + [(0, 5, 1)]
+        norbornane = ring(6) + [(0, 6, 1), (3, 6, 1)]
+        bicyclooctane = ring(6) + [(0, 6, 1), (6, 7, 1), (7, 3, 1)]
+        spirodecane = ring(5) + [(0, 5, 1), (5, 6, 1), (6, 7, 1), (7, 8, 1), (8, 0, 1)] + [(4, 9, 1)]
+        adamantane = [(0, 1, 1), (1, 2, 1), (2, 3, 1), (3, 4, 1), (4, 5, 1), (5, 0, 1),
+                      (1, 6, 1), (6, 7, 1), (7, 8, 1), (8, 3, 1), (5, 9, 1), (9, 7, 1)]
+        cubane = ring(4) + ring(4, 4) + [(i, i + 4, 1) for i in range(4)]
+        cases = [(naphthalene, 10, [6, 6]), (norbornane, 7, [5, 5]), (bicyclooctane, 8, [6, 6]),
+                 (spirodecane, 10, [5, 5]), (adamantane, 10, [6, 6, 6]), (cubane, 8, [4, 4, 4, 4, 4])]
+        for edges, count, sizes in cases:
+            self.assertRings(Molecule([Atom('C') for _ in range(count)], edges), sizes)
+
+    def testAgainstBruteForce(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            count = rng.randint(3, 12)
+            bonds = {(rng.randrange(node), node) for node in range(1, count)}
+            for _ in range(rng.randint(0, count)):
+                a, b = rng.randrange(count), rng.randrange(count)
+                if a != b:
+                    bonds.add((min(a, b), max(a, b)))
+            molecule = Molecule([Atom('C') for _ in range(count)], [(a, b, 1) for a, b in sorted(bonds)])
+            self.assertRings(molecule, cycleBasisSizes(molecule))
+
+    def testLargeRing(self):
+        # Rings longer than the first search depth of the perception.
+        molecule = Molecule([Atom('C') for _ in range(30)], ring(30) + [(0, 15, 1)])
+        self.assertRings(molecule, [16, 16])
+
+
+class DescriptorTest(unittest.TestCase):
+    def testDisconnected(self):
+        # The chloride ion is ignored; the values are those of tyrosine.
+        self.assertEqual(topologicalDescriptors([tyrosineHCl()]),
+                         [{'wiener': 268, 'diameter': 8, 'radius': 4}])
+
+    def testLargestComponent(self):
+        atoms = [Atom('C', 2) for _ in range(9)]
+        chain = [(i, i + 1, 1) for i in range(3)]
+        molecule = Molecule(atoms, chain + ring(5, 4))
+        self.assertEqual((molecule.diameter(), molecule.radius()), (2, 2))
+
+
+class SubstructureTest(unittest.TestCase):
+    def testBacktracking(self):
+        # The first candidates for the oxygen fail on the second bond order.
+        atoms = [Atom('C'), Atom('O'), Atom('C'), Atom('O'), Atom('C')]
+        molecule = Molecule(atoms, [(0, 1, 1), (1, 2, 1), (2, 3, 1), (3, 4, 2)])
+        query = Molecule([Atom('C'), Atom('O'), Atom('C')], [(0, 1, 1), (1, 2, 2)])
+        self.assertEqual(molecule.findSubstructure(query), {1: 3, 0: 2, 2: 4})
+        self.assertFalse(query.hasSubstructure(molecule))
+
+    def testLargeQuery(self):
+        # Used to exceed the recursion limit.
+        chain = Molecule([Atom('C', 2) for _ in range(2000)], [(i, i + 1, 1) for i in range(1999)])
+        self.assertEqual(len(chain.findSubstructure(chain)), 2000)
+
+
+class FromArraysTest(unittest.TestCase):
+    def testValid(self):
+        molecule = Molecule.from_arrays(['C', 6, 'O'], [3, 2, 1], [0, 0, 0], [0, 1], [1, 2], [1, 1])
+        self.assertEqual(molecule.formula(), 'C2H6O')
+
+    def testNonIntegers(self):
+        arrays = [[6, 6, 8], [3, 2, 1], [0, 0, 0], [0, 1], [1, 2], [1, 1]]
+        for position in range(6):
+            for value in (1.0, True):
+                broken = [list(values) for values in arrays]
+                broken[position][1] = value
+                with self.assertRaisesRegex(ValueError, 'at (atom|bond) 1$'):
+                    Molecule.from_arrays(*broken)
+
+
+class HydrogensTest(unittest.TestCase):
+    def testRoundTrip(self):
+        molecule = tyrosineHCl()
+        implicit, indices = molecule.addHydrogens().removeHydrogens()
+        self.assertEqual(implicit.canonicalString(), molecule.canonicalString())
+        self.assertEqual(indices, list(range(molecule.order())))
+
+    def testAmmonium(self):
+        # N+ with four hydrogens is not a valid Atom, so one stays explicit.
+        atoms = [Atom('N', 0, 1)] + [Atom('H') for _ in range(4)]
+        implicit, indices = Molecule(atoms, [(0, i, 1) for i in range(1, 5)]).removeHydrogens()
+        self.assertEqual([(atom.element, atom.hydrogens, atom.charge) for atom, _ in implicit.mol.values()],
+                         [(7, 3, 1), (1, 0, 0)])
+        self.assertEqual(indices, [0, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()